@@ -10,7 +10,8 @@ from PyQt5.QtWidgets import QAction, QCheckBox, QRadioButton, QSpinBox, QFormLay
 from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import QCoreApplication, QSize
 from player import Character
-import http.client, string, random, time, sys
+import string, random, time, sys
+import transport, ratelimit
 
 VERSION = "v0.3"
 
@@ -300,6 +301,11 @@ class Dice_Roller(QWidget):
         self.quiet_sel.setText("Quiet Mode")
         grid.addWidget(self.quiet_sel, 2,0)
 
+        #drama check, rolls are posted one die a second instead of all at once
+        self.drama_sel = QCheckBox()
+        self.drama_sel.setText("Drama")
+        grid.addWidget(self.drama_sel, 3,0)
+
         #again buttons
         #10 is selected on initiation
         #Might look into making this an explicit button group instead
@@ -359,9 +365,7 @@ class Dice_Roller(QWidget):
         #if quiet mode selected, returns a single element list stating total successes
         messages = char.roll_set(dice, rote, self.again, quiet)
 
-        for message in messages:
-            self.send(message, char.stats['webhook'])
-            time.sleep(1)
+        self.send_paced(messages, char.stats['webhook'])
 
         #Updates status with final element in list, which will be total successes
         self.parent.status_update(messages[-1].replace(" for " + char.stats['user id'],""))
@@ -384,108 +388,63 @@ class Dice_Roller(QWidget):
         #returns a list of strings, first states die value and second states its result 
         messages = char.roll_chance()
 
-        for message in messages:
-            self.send(message, char.stats['webhook'])
-            time.sleep(1)
+        self.send_paced(messages, char.stats['webhook'])
 
         #Prints final result to client console
         self.parent.status_update(messages[-1].replace(char.stats['user id'],"You"))
 
+    def send_paced(self, messages, webhook):
+        '''
+        Sends a roll's messages, packed into as few posts as possible unless drama mode is on.
+        Drama mode sends each message on its own a second apart.
+        '''
+        if self.drama_sel.checkState() == 2:
+            for message in messages:
+                self.send(message, webhook)
+                time.sleep(1)
+        else:
+            for message in transport.coalesce(messages):
+                self.send(message, webhook)
+
     def send(self, message, webhook):
         '''
         Sends message to webhook
         '''
 
-        #create connection
-        #If expanding to other services further changes will be required here
-        conn = http.client.HTTPSConnection("discordapp.com")
-        
-        #input sanitation: the seperator for each element is replaced by a space if found in message
-        sep = "--11BOUND11"
-        message = message.replace(sep, " ")
-
-        #This payload will make a Discord webhook send message to its associated channel
-        #If expanding to other services further changes may be required here
-        payload = sep + "\r\nContent-Disposition: form-data; name=\"content\"\r\n\r\n" + message + "\r\n" + sep + "--"
-
-        #headers for the connection
-        #If expanding to other services further changes may be required here
-        headers = {
-        'content-type': "multipart/form-data; boundary=" + sep[2:],
-        'cache-control': "no-cache",
-        }
-        
-        #sends a POST command to the webhook with the payload and headers defined above
-        conn.request("POST", webhook, payload, headers)
-        
-        #get response
-        res = conn.getresponse()
-        
-        #warning messages
-        text = res.read()
-        text = text.decode("utf-8")
-        
-        #first check if there was a warning message
-        #For discord, the data will be blank unless error occures sending webhook
-        #Usually a rate limit hit
-        #For expansion to other services this may need to be updated
-        
-        if text != "":
-            if "rate limited" in text:
-                #confirms that is is a rate limit on Discord
-                #Discord will helpfully tell the user how long they need to wait until the next retry 
-                index1 = text.find('"retry_after"')
-                chop = text[index1+13:]
-                wait = ''
-                for character in chop:
-                    #find the wait time requested
-                    #given in miliseconds usually
-                    if character in '0123456789':
-                        wait += character
-                    if character == '\n':
-                        break
-                
-                #wait will given in miliseconds, convert to seconds and add 0.5 just in case
-                wait = int(wait)/1000 + 0.5
-                
-                #update status, should always have at least 3 significant digits
-                self.parent.status_update("Rate limit hit. Will try again in " + str(wait)[:4] + " seconds.")
+        #This payload will make a Discord webhook send message to its associated channel, see transport.form
+        payload, headers = transport.form(message)
 
-                #try again after wait
-                time.sleep(wait)
-                send(message, webhook)
-                
-            if "400 Bad Request" in text:
-                #Likely bad bad URL
-                #look into making a pop up dialogue instead
-                self.parent.status_update("400 Bad Request - Double check URL.")
-                return
-
-            else:
-                #Unexpected problem - Result printed to client console
-                #goes as a temp message so it won't be overwritten by success message
-                #user can still find results in last roll display
-                #might look into making this a pop up dialogue instead
-                index1 = text.find('"message"')
-                index2 = text.find('\n', index1)
-                chop = text[index1:index2]
-                self.parent.statusBar.showMessage(chop)
-                return
-            #end of if statement for warning message
-
-            #now include some rate limit protection
-            remaining = int(res.getheader('X-RateLimit-Remaining'))
-            reset = int(res.getheader('X-RateLimit-Reset')) - int(time.time())
-
-            #reset should be the number of seconds until rate limit refreshed
-            #In my experience it will reset faster than this
-            #For now, it will add delays to messages if remaining message count is less than or equal to 2
-
-            if remaining <= 2:
-                self.parent.status_update("Rate Limit approaching. Next message delay is 2 seconds.")
-                #already a 1 second delay between messages, so extra secound added here
-                time.sleep(1)
-                
+        #waits until the webhook's rate limit has room, see ratelimit.py
+        wait = ratelimit.LIMITER.reserve(webhook)
+        if wait > 0:
+            self.parent.status_update("Rate limit reached. Next message in " + str(wait)[:4] + " seconds.")
+            time.sleep(wait)
+
+        #sends a POST command to the webhook with the payload and headers defined above
+        #connections to the host are kept open and reused between messages, see transport.py
+        try:
+            res, text = transport.POOL.request("POST", webhook, payload, headers)
+        except Exception:
+            ratelimit.LIMITER.release(webhook)
+            raise
+
+        #the response headers say how much of the rate limit is left and when it refills
+        ratelimit.LIMITER.update(webhook, res.headers)
+
+        #warning messages are in text
+        outcome, detail = transport.read_response(res.status, text)
+
+        if outcome == transport.RATE_LIMITED:
+            #update status, should always have at least 3 significant digits
+            self.parent.status_update("Rate limit hit. Will try again in " + str(detail)[:4] + " seconds.")
+
+            #try again after wait, other messages to this webhook wait as well
+            ratelimit.LIMITER.limited(webhook, detail)
+            self.send(message, webhook)
+
+        elif outcome == transport.FAILED:
+            #look into making a pop up dialogue instead
+            self.parent.status_update(detail)
 
 
 if __name__ == '__main__':
@@ -7,11 +7,11 @@
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
-import http.client, time, sys, copy, random, ctypes
+import time, sys, copy, ctypes, queue
 import urllib.error
 import urllib.request
 from player import Character
-import stats
+import stats, rng, history, batch, contest, initiative, combat, audit, transport, ratelimit, delivery
 import mageUI, mageInventory
 import vampireUI, vampireInventory
 
@@ -297,6 +297,23 @@ class Main(QMainWindow):
         personality_action = QAction('&Personality Settings', self)
         personality_action.triggered.connect(self.personality)
         options_Menu.addAction(personality_action)
+        ## Secure dice
+        self.secure_action = QAction('&Use Secure Dice', self)
+        self.secure_action.setCheckable(True)
+        self.secure_action.setStatusTip("Roll with the operating system's cryptographic random source")
+        self.secure_action.triggered.connect(self.secure_dice)
+        options_Menu.addAction(self.secure_action)
+        ## Roll log
+        self.log_action = QAction('&Record Rolls', self)
+        self.log_action.setCheckable(True)
+        self.log_action.setStatusTip("Write every roll to a log file that can be replayed to check it")
+        self.log_action.triggered.connect(self.record_rolls)
+        options_Menu.addAction(self.log_action)
+        ## Dice fairness
+        audit_action = QAction('&Dice Fairness', self)
+        audit_action.setStatusTip("Check every die rolled so far for signs of bias")
+        audit_action.triggered.connect(self.audit_display)
+        options_Menu.addAction(audit_action)
 
         # help menu
         help_Menu = menubar.addMenu('&Help')
@@ -334,6 +351,7 @@ class Main(QMainWindow):
 
             self.sheet = Sheet(self.character)
             self.setCentralWidget(self.sheet)
+            self.sync_dice_options()
             self.edit_Action.setChecked(True) # set checked
             self.edit_mode()
 
@@ -406,6 +424,49 @@ class Main(QMainWindow):
         self.dialog.show()
 
 
+    def secure_dice(self):
+        '''
+        Switches the character between the shared dice source and a cryptographic one.
+        '''
+        if self.secure_action.isChecked():
+            self.character.rng = rng.SecureRNG()
+        else:
+            self.character.rng = rng.DEFAULT
+
+    def audit_display(self):
+        self.dialog = New_Window(Audit_Display(), "Dice Fairness")
+        self.dialog.show()
+
+    def record_rolls(self):
+        '''
+        Starts or stops writing the character's rolls to a replayable log.
+        '''
+        if not self.log_action.isChecked():
+            self.character.stop_roll_log()
+            self.secure_action.setEnabled(True)
+            return
+
+        path = QFileDialog.getSaveFileName(self, 'Record Rolls', "characters/", "Roll Log (*.dcrl)")[0]
+        if not path:
+            # cancelled
+            self.log_action.setChecked(False)
+            return
+
+        # logged rolls need a seeded stream, so secure dice can't be used at the same time
+        self.secure_action.setChecked(False)
+        self.secure_action.setEnabled(False)
+        self.character.start_roll_log(path)
+
+    def sync_dice_options(self):
+        '''
+        Sets the dice options to match the current character, used whenever another character is swapped in.
+        '''
+        logging = self.character.roll_log is not None
+        self.log_action.setChecked(logging)
+        self.secure_action.setChecked(isinstance(self.character.rng, rng.SecureRNG))
+        # logged rolls need a seeded stream, so secure dice can't be used at the same time
+        self.secure_action.setEnabled(not logging)
+
     def edit_mode(self):
         if self.edit_Action.isChecked():
             # edit mode turned on, save current copy of character
@@ -455,6 +516,7 @@ class Main(QMainWindow):
             self.character = self.old_character
             self.sheet = Sheet(self.character)
             self.setCentralWidget(self.sheet)
+            self.sync_dice_options()
 
     def save(self, save_as = False):        
 
@@ -497,6 +559,7 @@ class Main(QMainWindow):
         # redraw UI with new character object
         self.sheet = Sheet(self.character)
         self.setCentralWidget(self.sheet)
+        self.sync_dice_options()
 
     def open_roller(self):
         self.dialog = Roller(self.character)
@@ -524,8 +587,12 @@ class Main(QMainWindow):
         badMessages_changed = self.character.badMessages != self.old_character.badMessages
         goodRates_changed = self.character.goodRate != self.old_character.goodRate
         badRates_changed = self.character.badRate != self.old_character.badRate
+        # roll statistics are saved with the character, so new rolls count as changes
+        roll_stats_changed = (self.character.roll_stats.totals != self.old_character.roll_stats.totals
+                              or self.character.roll_stats.histogram != self.old_character.roll_stats.histogram)
             
-        if stat_changed or note_changed or goodMessages_changed or badMessages_changed or goodRates_changed or badRates_changed:
+        if (stat_changed or note_changed or goodMessages_changed or badMessages_changed or goodRates_changed
+                or badRates_changed or roll_stats_changed):
             # unsaved changes
             message = QMessageBox()
             message.setWindowTitle("Save Changes")
@@ -686,9 +753,8 @@ class Personality(QWidget):
             message = message.replace("\n", "")
         badMessages = [i for i in badMessages if i != '']
 
-        # update character object
-        self.character.goodMessages = goodMessages
-        self.character.badMessages = badMessages
+        # update character object, this also rebuilds the compiled messages
+        self.character.set_messages(goodMessages, badMessages)
 
         # ask save
         self.parent.ask_save()
@@ -768,6 +834,17 @@ class Last_Roll_Display(QWidget):
     '''
     Opens window to display last roll details
     '''
+
+    # filters for the recent rolls list, passed to RollHistory.latest
+    FILTERS = [("All Rolls", {}),
+               ("Rote Rolls", {'rote': True}),
+               ("Chance Rolls", {'kind': 'chance'}),
+               ("10 Again Rolls", {'again': 10}),
+               ("9 Again Rolls", {'again': 9}),
+               ("8 Again Rolls", {'again': 8})]
+
+    # number of earlier rolls listed
+    RECENT = 5
     
     def __init__(self, character):
         super().__init__()
@@ -798,8 +875,75 @@ class Last_Roll_Display(QWidget):
         copy_button.clicked.connect(lambda: clipboard.setText(text))
         copy_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
         grid.addWidget(copy_button, 1, 1)
+
+        # recent rolls, picked from the roll history
+        self.recent_filter = QComboBox()
+        for name, filters in self.FILTERS:
+            self.recent_filter.addItem(name)
+        self.recent_filter.currentIndexChanged.connect(self.update_recent)
+        grid.addWidget(self.recent_filter, 2, 0, 1, 2)
+
+        self.recent = QLabel()
+        self.recent.setStyleSheet("""QLabel {background-color: white;
+                                        border-style: inset;
+                                        border-width: 2px; border-color: #C0C0C0;}""" )
+        grid.addWidget(self.recent, 3, 0, 1, 2)
+        self.update_recent()
+
+        # running statistics for every roll this character has made
+        roll_stats = QLabel("\n".join(self.character.roll_stats.lines()))
+        grid.addWidget(roll_stats, 4, 0, 1, 2)
+
+    def update_recent(self):
+        '''
+        Lists the latest rolls matching the selected filter.
+        '''
+        filters = self.FILTERS[self.recent_filter.currentIndex()][1]
+        results = self.character.history.latest(self.RECENT, **filters)
+
+        if not results:
+            self.recent.setText("No matching rolls.")
+        else:
+            self.recent.setText("\n".join(history.describe(result) for result in results))
         
 
+class Audit_Display(QWidget):
+    '''
+    Shows the results of the dice fairness audit, refreshed while open
+    '''
+
+    # milliseconds between refreshes
+    REFRESH = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.initUI()
+
+    def initUI(self):
+        grid = QGridLayout()
+        self.setLayout(grid)
+
+        self.content = QLabel()
+        self.content.setStyleSheet("""QLabel {background-color: white;
+                                        border-style: inset;
+                                        border-width: 2px; border-color: #C0C0C0;}""" )
+        grid.addWidget(self.content, 0, 0, 1, 2)
+
+        clipboard = QApplication.clipboard()
+        copy_button = QPushButton("Copy to Clipboard")
+        copy_button.clicked.connect(lambda: clipboard.setText(self.content.text()))
+        copy_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        grid.addWidget(copy_button, 1, 1)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_results)
+        self.timer.start(self.REFRESH)
+        self.update_results()
+
+    def update_results(self):
+        self.content.setText("\n".join(audit.AUDITOR.lines()))
+
+
 class Dice_Roller(QWidget):
     '''
     widget for dice rolls
@@ -864,9 +1008,17 @@ class Dice_Roller(QWidget):
         grid.addWidget(self.rote_sel, 1, 0)
 
         # quiet check
+        # inner grid so the drama check sits beside the multiline setting it changes
+        checkgrid = QGridLayout()
         self.multiline_sel = QCheckBox()
         self.multiline_sel.setText("Multiline")
-        grid.addWidget(self.multiline_sel, 2, 0)
+        checkgrid.addWidget(self.multiline_sel, 0, 0)
+
+        # drama check, multiline rolls are posted one die a second instead of all at once
+        self.drama_sel = QCheckBox()
+        self.drama_sel.setText("Drama")
+        checkgrid.addWidget(self.drama_sel, 0, 1)
+        grid.addLayout(checkgrid, 2, 0)
 
         # again buttons
         # 10 is selected on initiation
@@ -887,6 +1039,64 @@ class Dice_Roller(QWidget):
         again8.toggled.connect(lambda: self.change_again(again8))
         grid.addWidget(again8, 2, 1)
 
+        # dice expression, e.g. dex+firearms+2 9again rote
+        self.expression = QLineEdit()
+        self.expression.setPlaceholderText("e.g. dex+firearms+2 9again rote")
+        self.expression.returnPressed.connect(self.expression_handler)
+        grid.addWidget(self.expression, 3, 0, 1, 2)
+
+        expression_button = QPushButton("Roll Expression")
+        expression_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        expression_button.clicked.connect(self.expression_handler)
+        grid.addWidget(expression_button, 3, 2)
+
+        # extended actions, rolled with the pool and options above
+        extended_box = QHBoxLayout()
+        extended_box.addWidget(QLabel("Target"))
+        self.target = QSpinBox()
+        self.target.setMinimum(1)
+        self.target.setValue(5)
+        self.target.setMaximumSize(QSize(35, 20))
+        extended_box.addWidget(self.target)
+        extended_box.addWidget(QLabel("Roll Limit"))
+        self.limit = QSpinBox()
+        self.limit.setMinimum(1)
+        self.limit.setValue(5)
+        self.limit.setMaximumSize(QSize(35, 20))
+        extended_box.addWidget(self.limit)
+        grid.addLayout(extended_box, 4, 0, 1, 2)
+
+        extended_button = QPushButton("Roll Extended")
+        extended_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        extended_button.clicked.connect(self.extended_handler)
+        grid.addWidget(extended_button, 4, 2)
+
+        # batch rolls for many NPCs
+        batch_button = QPushButton("Batch Roll")
+        batch_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        batch_button.clicked.connect(self.batch_display)
+        grid.addWidget(batch_button, 5, 2)
+
+        # turn order, kept between fights until cleared
+        self.tracker = initiative.InitiativeTracker(self.character.rng)
+        initiative_button = QPushButton("Initiative")
+        initiative_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        initiative_button.clicked.connect(self.initiative_display)
+        grid.addWidget(initiative_button, 5, 1)
+
+        # stat blocks of anyone attacked, so their damage adds up between attacks
+        self.targets = {}
+        attack_button = QPushButton("Attack")
+        attack_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        attack_button.clicked.connect(self.attack_display)
+        grid.addWidget(attack_button, 5, 0)
+
+        if self.character.splat == 'mage':
+            cast_button = QPushButton("Cast Spell")
+            cast_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+            cast_button.clicked.connect(self.cast_display)
+            grid.addWidget(cast_button, 6, 2)
+
     def change_again(self, button):
         '''
         Method that runs whenever an again radio button is clicked
@@ -926,62 +1136,34 @@ class Dice_Roller(QWidget):
         # this returns a list of strings of each die result follwoed by total successes
         # if quiet mode selected, returns a single element list stating roll summary
         messages = self.character.roll_set(dice, rote, self.again, quiet)
+        self.deliver_roll(messages, quiet)
 
+    def deliver_roll(self, messages, quiet):
+        '''
+        Sends the messages from a dice pool roll and updates the status bar.
+        '''
         # quiet mode, only send first message to channel, which will be a summary
         if quiet:
-            send(messages[0], self.character.stats['webhook'], self.parent)
-            time.sleep(1)
-
+            outgoing = messages[:1]
         else:
-            for message in messages:
-                send(message, self.character.stats['webhook'], self.parent)
-                time.sleep(1)
-
-        # Final element in list will be total successes
-        # Check if it warrants a special message
-        self.personality_message(messages[-1])
-
-        # Update the roller window status bar with final successes
-        self.parent.status_update(messages[-1].replace(" for " + self.character.stats['user id'],""))
-        
-    def personality_message(self,message):
-        '''
-        Takes the final message from the roll, determines if a positive/negative message should be sent.
-        :param message: string
-        :return: None
-        '''
-        index = -1
-        value = ''
-
-        # Use loop to get the digits from message
-        while True:
-            if message[index].isdigit():
-                value = message[index] + value
-                index -= 1
-            else:
-                break
+            outgoing = list(messages)
 
-        value = int(value)
+        # Check if the successes warrant a special message
+        outgoing.extend(self.character.personality_message(self.character.last_result.successes))
 
-        if value == 0 and random.randrange(1,100) <= self.character.badRate:
-            self.bot_message("bad")
-        elif value >= 5 and random.randrange(1,100) <= self.character.goodRate:
-            self.bot_message("good")
+        # messages are sent in the background, the roller window status bar shows final successes once they are
+        self.parent.status_update("Sending roll.")
+        self.deliver_paced(outgoing, messages[-1].replace(" for " + self.character.stats['user id'],""))
 
-    def bot_message(self, messagetype):
+    def deliver_paced(self, messages, done):
         '''
-        Randomly sends a positive/negative message with very good or very bad rolls
-        :param type: "good" or "bad"
-        :return: none
+        Sends a roll's messages, packed into as few posts as possible unless drama mode is on.
+        Drama mode sends each message on its own a second apart, as the roller always used to.
         '''
-
-        if messagetype == 'good':
-                out = random.choice(self.character.goodMessages)
+        if self.drama_sel.checkState() == 2:
+            deliver(messages, self.character.stats['webhook'], self.parent, done=done)
         else:
-                out = random.choice(self.character.badMessages)
-
-        out = out.replace("[userID]", self.character.stats['user id'])
-        send(out, self.character.stats['webhook'], self.parent)
+            deliver(transport.coalesce(messages), self.character.stats['webhook'], self.parent, delay=0, done=done)
 
     def chance_handler(self):
         '''
@@ -999,13 +1181,98 @@ class Dice_Roller(QWidget):
         # use roll_chance method for character object
         # returns a list of strings, first states die value and second states its result 
         messages = self.character.roll_chance()
+        self.deliver_chance(messages)
+
+    def deliver_chance(self, messages):
+        '''
+        Sends the messages from a chance roll and updates the status bar.
+        '''
+        # Prints final result to client console once the messages are sent
+        self.parent.status_update("Sending roll.")
+        self.deliver_paced(messages, messages[-1].replace(self.character.stats['user id'],"You"))
+
+    def expression_handler(self):
+        '''
+        Handler for rolling the typed dice expression.
+        '''
+        # Check if details entered yet
+        if self.character.stats['webhook'] == "" or self.character.stats['user id'] == "":
+            # Tell user something is missing and then stop
+            self.parent.status_update("User Details Missing.")
+            return
+
+        text = self.expression.text()
+        if not text.strip():
+            self.parent.status_update("Please enter a dice expression.")
+            return
+
+        self.parent.status_update("Rolling dice.")
+        quiet = self.multiline_sel.checkState() != 2
 
-        for message in messages:
-            send(message, self.character.stats['webhook'], self.parent)
-            time.sleep(1)
+        try:
+            messages = self.character.roll_expression(text, quiet)
+        except ValueError as error:
+            # expression could not be read, e.g. unknown stat
+            self.parent.status_update(str(error))
+            return
 
-        # Prints final result to client console
-        self.parent.status_update(messages[-1].replace(self.character.stats['user id'],"You"))
+        # pools below 1 are rolled as a chance die
+        if self.character.last_result.kind == 'chance':
+            self.deliver_chance(messages)
+        else:
+            self.deliver_roll(messages, quiet)
+
+    def extended_handler(self):
+        '''
+        Handler for the extended action button, sends the whole action as one summary.
+        '''
+        # Check if details entered yet
+        if self.character.stats['webhook'] == "" or self.character.stats['user id'] == "":
+            # Tell user something is missing and then stop
+            self.parent.status_update("User Details Missing.")
+            return
+
+        self.parent.status_update("Rolling extended action.")
+
+        rote = self.rote_sel.checkState() == 2
+        messages = self.character.roll_extended(self.num.value(), self.target.value(), self.limit.value(),
+                                                rote, self.again)
+
+        deliver_summary(messages[0], self.character.stats['webhook'], self.parent)
+
+        # Update the roller window status bar with final successes
+        self.parent.status_update(messages[-1].replace(" for " + self.character.stats['user id'],""))
+
+    def cast_display(self):
+        '''
+        method to open the spellcasting window in a pop up window
+        '''
+        cast_window = mageUI.CastWindow(self.character, self.parent,
+                                        lambda message: deliver_summary(message, self.character.stats['webhook'],
+                                                                        self.parent))
+        self.dialog = New_Window(cast_window, "Cast Spell")
+        self.dialog.show()
+
+    def attack_display(self):
+        '''
+        method to open the attack window in a pop up window
+        '''
+        self.dialog = New_Window(Attack_Window(self.parent, self.character, self.targets), "Attack")
+        self.dialog.show()
+
+    def initiative_display(self):
+        '''
+        method to open the initiative tracker in a pop up window
+        '''
+        self.dialog = New_Window(Initiative_Tracker(self.parent, self.character, self.tracker), "Initiative")
+        self.dialog.show()
+
+    def batch_display(self):
+        '''
+        method to open the batch roller in a pop up window
+        '''
+        self.dialog = New_Window(Batch_Roller(self.parent, self.character), "Batch Roll")
+        self.dialog.show()
 
     def last_roll_display(self):
         '''
@@ -1025,102 +1292,421 @@ class Dice_Roller(QWidget):
             self.dialog = New_Window(Last_Roll_Display(self.character), "Last Roll")
             self.dialog.show()
 
-def send(message, webhook, parent):
+class Batch_Roller(QWidget):
     '''
-    Sends message to webhook
+    Rolls many labelled pools at once and sends a single summary message
     '''
+    def __init__(self, parent, character):
+        super().__init__()
+        self.parent = parent
+        self.character = character
+        self.initUI()
 
-    # create connection
-    # If expanding to other services further changes will be required here
-    conn = http.client.HTTPSConnection("discordapp.com")
+    def initUI(self):
+        grid = QGridLayout()
+        self.setLayout(grid)
+
+        label = QLabel("One pool per line, e.g. Ghoul 1: 5 9again rote")
+        grid.addWidget(label, 0, 0, 1, 2)
 
-    # input sanitation: the seperator for each element is replaced by a space if found in message
-    sep = "--11BOUND11"
-    message = message.replace(sep, " ")
+        self.pools = QTextEdit()
+        grid.addWidget(self.pools, 1, 0, 1, 2)
 
-    # This payload will make a Discord webhook send message to its associated channel
-    # If expanding to other services further changes may be required here
-    payload = sep + "\r\nContent-Disposition: form-data; name=\"content\"\r\n\r\n" + message + "\r\n" + sep + "--"
+        roll_button = QPushButton("Roll Batch")
+        roll_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        roll_button.clicked.connect(self.roll_handler)
+        grid.addWidget(roll_button, 2, 1)
 
-    # headers for the connection
-    # If expanding to other services further changes may be required here
-    headers = {
-                'content-type': "multipart/form-data; boundary=" + sep[2:],
-                'cache-control': "no-cache",
-                }
+        contest_button = QPushButton("Resolve Contest")
+        contest_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        contest_button.clicked.connect(self.contest_handler)
+        grid.addWidget(contest_button, 2, 0)
 
-    # sends a POST command to the webhook with the payload and headers defined above
-    conn.request("POST", webhook, payload, headers)
-
-    # get response
-    res = conn.getresponse()
-
-    # warning messages
-    text = res.read()
-    text = text.decode("utf-8")
-
-    # first check if there was a warning message
-    # For discord, the data will be blank unless error occures sending webhook
-    # Usually a rate limit hit
-    # For expansion to other services this may need to be updated
-
-    if text != "":
-        if "rate limited" in text:
-            # confirms that is is a rate limit on Discord
-            # Discord will helpfully tell the user how long they need to wait until the next retry
-            index1 = text.find('"retry_after"')
-            chop = text[index1+13:]
-            wait = ''
-            for character in chop:
-                # find the wait time requested
-                # given in miliseconds usually
-                if character in '0123456789':
-                    wait += character
-                if character == '\n':
-                    break
-
-            # wait will given in miliseconds, convert to seconds and add 0.5 just in case
-            wait = int(wait)/1000 + 0.5
-
-            # update status, should always have at least 3 significant digits
-            parent.status_update("Rate limit hit. Will try again in " + str(wait)[:4] + " seconds.")
-
-            # try again after wait
-            time.sleep(wait)
-            send(message, webhook)
-
-        if "400 Bad Request" in text:
-            # Likely bad bad URL
-            # look into making a pop up dialogue instead
-            parent.status_update("400 Bad Request - Double check URL.")
+    def read_entries(self, minimum=1):
+        '''
+        Reads the pools entered, updating the status bar and returning None if they can't be used.
+        '''
+        if self.character.stats['webhook'] == "":
+            self.parent.status_update("User Details Missing.")
+            return
+
+        try:
+            entries = batch.parse_batch(self.pools.toPlainText())
+        except ValueError as error:
+            self.parent.status_update(str(error))
+            return
+
+        if len(entries) < minimum:
+            self.parent.status_update("Please enter at least " + str(minimum) + (" pools." if minimum > 1 else " pool."))
+            return
+
+        return entries
+
+    def roll_handler(self):
+        '''
+        handler for when roll button pushed
+        '''
+        entries = self.read_entries()
+        if not entries:
+            return
+
+        self.parent.status_update("Rolling " + str(len(entries)) + " pools.")
+
+        # every pool is rolled together and reported in as few messages as fit
+        results = batch.roll_batch(entries, self.character.rng)
+        deliver_summary(batch.summary(results), self.character.stats['webhook'], self.parent)
+
+        total = sum(result.successes for label, result in results)
+        self.parent.status_update("Batch rolled: " + str(total) + " total successes")
+
+    def contest_handler(self):
+        '''
+        handler for when contest button pushed, every pool entered contests the others
+        '''
+        entries = self.read_entries(2)
+        if not entries:
+            return
+
+        outcome = contest.resolve(entries, self.character.rng)
+        deliver_summary(contest.summary([outcome]), self.character.stats['webhook'], self.parent)
+
+        if outcome[0] is None:
+            self.parent.status_update("Contest tied.")
+        else:
+            self.parent.status_update(outcome[0] + " wins the contest.")
+
+
+class Initiative_Tracker(QWidget):
+    '''
+    Rolls initiative for many combatants and sends the turn order as a single message
+    '''
+    def __init__(self, parent, character, tracker):
+        super().__init__()
+        self.parent = parent
+        self.character = character
+        self.tracker = tracker
+        self.initUI()
+
+    def initUI(self):
+        grid = QGridLayout()
+        self.setLayout(grid)
+
+        label = QLabel("One combatant per line, e.g. Ghoul 1: 5")
+        grid.addWidget(label, 0, 0, 1, 3)
+
+        self.combatants = QTextEdit()
+        grid.addWidget(self.combatants, 1, 0, 1, 3)
+
+        add_button = QPushButton("Add Combatants")
+        add_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        add_button.clicked.connect(self.add_handler)
+        grid.addWidget(add_button, 2, 0)
+
+        self_button = QPushButton("Add Me")
+        self_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        self_button.clicked.connect(lambda: self.add_combatants([self.character]))
+        grid.addWidget(self_button, 2, 1)
+
+        clear_button = QPushButton("Clear")
+        clear_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        clear_button.clicked.connect(self.clear_handler)
+        grid.addWidget(clear_button, 2, 2)
+
+        self.remove_name = QLineEdit()
+        self.remove_name.setPlaceholderText("Combatant to remove")
+        grid.addWidget(self.remove_name, 3, 0, 1, 2)
+
+        remove_button = QPushButton("Remove")
+        remove_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        remove_button.clicked.connect(self.remove_handler)
+        grid.addWidget(remove_button, 3, 2)
+
+        self.order = QLabel()
+        grid.addWidget(self.order, 4, 0, 1, 3)
+
+        post_button = QPushButton("Post Order")
+        post_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        post_button.clicked.connect(self.post_handler)
+        grid.addWidget(post_button, 5, 2)
+
+        self.update_order()
+
+    def update_order(self):
+        self.order.setText(self.tracker.summary())
+
+    def add_combatants(self, combatants):
+        '''
+        Rolls initiative for the combatants given, all in one go
+        '''
+        # follow the character's dice, in case secure dice were switched on since
+        self.tracker.source = self.character.rng
+        rolled = self.tracker.add(combatants)
+        self.update_order()
+        self.parent.status_update("Rolled initiative for " + str(len(rolled)) + " combatants.")
+
+    def add_handler(self):
+        '''
+        handler for when add button pushed
+        '''
+        try:
+            combatants = initiative.parse_combatants(self.combatants.toPlainText())
+        except ValueError as error:
+            self.parent.status_update(str(error))
+            return
+
+        if not combatants:
+            self.parent.status_update("Please enter at least 1 combatant.")
+            return
+
+        self.add_combatants(combatants)
+        self.combatants.clear()
+
+    def remove_handler(self):
+        '''
+        handler for when remove button pushed
+        '''
+        label = self.remove_name.text().strip()
+        if label not in self.tracker:
+            self.parent.status_update(label + " is not in the initiative order.")
+            return
+
+        self.tracker.remove(label)
+        self.remove_name.clear()
+        self.update_order()
+        self.parent.status_update(label + " removed from initiative.")
+
+    def clear_handler(self):
+        self.tracker.clear()
+        self.update_order()
+        self.parent.status_update("Initiative cleared.")
+
+    def post_handler(self):
+        '''
+        handler for when post button pushed, sends the whole turn order as one message
+        '''
+        if self.character.stats['webhook'] == "":
+            self.parent.status_update("User Details Missing.")
             return
 
-        elif text != "":
-            # Unexpected problem - Result printed to client console
-            # goes as a temp message so it won't be overwritten by success message
-            # user can still find results in last roll display
-            # might look into making this a pop up dialogue instead
-            index1 = text.find('"message"')
-            index2 = text.find('\n', index1)
-            chop = text[index1:index2]
-            parent.status_update(chop)
+        if not len(self.tracker):
+            self.parent.status_update("Nobody has rolled initiative.")
             return
-        # end of if statement for warning message
 
-        # now include some rate limit protection
-        remaining = int(res.getheader('X-RateLimit-Remaining'))
-        # reset = int(res.getheader('X-RateLimit-Reset')) - int(time.time())
+        deliver_summary(self.tracker.summary(), self.character.stats['webhook'], self.parent)
+        self.parent.status_update("Initiative order sent.")
+
+
+class Attack_Window(QWidget):
+    '''
+    Makes a weapon attack against a target and sends the outcome as a single message
+    '''
+    def __init__(self, parent, character, targets):
+        super().__init__()
+        self.parent = parent
+        self.character = character
+        self.targets = targets
+        self.initUI()
+
+    def initUI(self):
+        grid = QGridLayout()
+        self.setLayout(grid)
+
+        grid.addWidget(QLabel("Weapon/Attack:"), 0, 0)
+        self.weapon = QComboBox()
+        self.weapon.addItem("Unarmed")
+        for name in self.character.stats['weapons']:
+            self.weapon.addItem(name.title(), name)
+        grid.addWidget(self.weapon, 0, 1)
+
+        grid.addWidget(QLabel("Target:"), 1, 0)
+        self.target = QLineEdit()
+        self.target.setPlaceholderText("Target")
+        grid.addWidget(self.target, 1, 1)
+
+        # target's details, defense is ignored by ranged attacks
+        numbers = [("Defense:", 0, 0), ("Armor:", 0, 0), ("Health:", 1, 7), ("Modifier:", -100, 0)]
+        self.numbers = []
+        for row, (text, minimum, value) in enumerate(numbers, 2):
+            grid.addWidget(QLabel(text), row, 0)
+            entry = QSpinBox()
+            entry.setMinimum(minimum)
+            entry.setValue(value)
+            entry.setMaximumSize(QSize(35, 20))
+            grid.addWidget(entry, row, 1)
+            self.numbers.append(entry)
+
+        attack_button = QPushButton("Attack")
+        attack_button.setStyleSheet("QPushButton:pressed { background-color: white }" )
+        attack_button.clicked.connect(self.attack_handler)
+        grid.addWidget(attack_button, 6, 1)
+
+    def attack_handler(self):
+        '''
+        handler for when attack button pushed
+        '''
+        if self.character.stats['webhook'] == "" or self.character.stats['user id'] == "":
+            self.parent.status_update("User Details Missing.")
+            return
+
+        defense, armor, health, modifier = (entry.value() for entry in self.numbers)
+        name = self.target.text().strip() or "Target"
+
+        # keep damage from earlier attacks on the same target
+        target = self.targets.setdefault(name, {'name': name, 'health': [health, 0, 0, 0]})
+        target['defense'] = defense
+        target['armor'] = armor
+        target['health'][0] = health
+
+        outcome = combat.attack(self.character, target, self.weapon.currentData(), modifier,
+                                source=self.character.rng)
+        deliver_summary(combat.summary([outcome]), self.character.stats['webhook'], self.parent)
+
+        if outcome['damage']:
+            self.parent.status_update(name + " took " + str(outcome['damage']) + " "
+                                      + combat.DAMAGE_NAMES[outcome['damage type']] + " damage.")
+        else:
+            self.parent.status_update("Attack did no damage.")
+
+
+class Delivery_Worker(QThread):
+    '''
+    Sends webhook messages on its own thread, so the windows stay responsive while rolls are posted.
+    Messages go out in the order they were queued. Status updates are passed back to the window that
+    queued them through the status signal.
+    '''
+    status = pyqtSignal(object, str)
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = queue.Queue()
+        # the worker object lives on the main thread, so this runs there
+        self.status.connect(self.show_status)
+
+    def deliver(self, messages, webhook, parent, delay=1, done=None):
+        '''
+        Queues messages to be sent.
+        :param delay: seconds waited after each message
+        :param done: status shown once every message is sent
+        '''
+        self.jobs.put((messages, webhook, parent, delay, done))
+        if not self.isRunning():
+            self.start()
+
+    def run(self):
+        while True:
+            messages, webhook, parent, delay, done = self.jobs.get()
+            relay = Status_Relay(self, parent)
+            failed = False
+            for message in messages:
+                try:
+                    send(message, webhook, relay)
+                except transport.ERRORS as error:
+                    # network trouble, report it and carry on with the next message
+                    relay.status_update("Could not send message: " + str(error))
+                    failed = True
+                if delay:
+                    time.sleep(delay)
+            # the error is left showing rather than the result
+            if done and not failed:
+                relay.status_update(done)
+
+    def show_status(self, parent, message):
+        try:
+            parent.status_update(message)
+        except RuntimeError:
+            # window was closed while its messages were being sent
+            pass
+
+
+class Status_Relay:
+    '''
+    Stands in for a window's status bar on the delivery thread
+    '''
+    def __init__(self, worker, parent):
+        self.worker = worker
+        self.parent = parent
+
+    def status_update(self, message):
+        self.worker.status.emit(self.parent, message)
+
+
+# created on first use, as it needs the QApplication
+WORKER = None
+
+
+def deliver(messages, webhook, parent, delay=1, done=None):
+    '''
+    Sends messages to webhook in the background, see Delivery_Worker.
+    '''
+    global WORKER
+    if WORKER is None:
+        WORKER = Delivery_Worker()
+    WORKER.deliver(messages, webhook, parent, delay, done)
+
+
+# asyncio delivery engine for the GM windows, created on first use
+ENGINE = None
+
+
+def deliver_summary(text, webhook, parent):
+    '''
+    Sends a summary of several lines at once, split across posts if it is too long for one message.
+    Summaries go through the asyncio delivery engine, so posts from the batch, contest, initiative, attack and
+    spell windows to different webhooks go out at the same time, see delivery.py.
+    '''
+    global WORKER, ENGINE
+    if WORKER is None:
+        WORKER = Delivery_Worker()
+    if ENGINE is None:
+        ENGINE = delivery.BackgroundDelivery()
+    # status updates come back through the worker's signal, on the main thread
+    ENGINE.deliver(transport.coalesce(text.splitlines()), webhook, Status_Relay(WORKER, parent).status_update,
+                   delay=0)
+
+
+def send(message, webhook, parent):
+    '''
+    Sends message to webhook
+    '''
+
+    # This payload will make a Discord webhook send message to its associated channel, see transport.form
+    payload, headers = transport.form(message)
+
+    # waits until the webhook's rate limit has room, shared with every other character on it, see ratelimit.py
+    wait = ratelimit.LIMITER.reserve(webhook)
+    if wait > 0:
+        parent.status_update("Rate limit reached. Next message in " + str(wait)[:4] + " seconds.")
+        time.sleep(wait)
+
+    # sends a POST command to the webhook with the payload and headers defined above
+    # connections to the host are kept open and reused between messages, see transport.py
+    try:
+        res, text = transport.POOL.request("POST", webhook, payload, headers)
+    except Exception:
+        ratelimit.LIMITER.release(webhook)
+        raise
+
+    # the response headers say how much of the rate limit is left and when it refills
+    ratelimit.LIMITER.update(webhook, res.headers)
+
+    # warning messages are in text
+    outcome, detail = transport.read_response(res.status, text)
+
+    if outcome == transport.RATE_LIMITED:
+        # update status, should always have at least 3 significant digits
+        parent.status_update("Rate limit hit. Will try again in " + str(detail)[:4] + " seconds.")
 
-        # reset should be the number of seconds until rate limit refreshed
-        # In my experience it will reset faster than this
-        # For now, it will add delays to messages if remaining message count is less than or equal to 2
+        # try again after wait, other messages to this webhook wait as well
+        ratelimit.LIMITER.limited(webhook, detail)
+        send(message, webhook, parent)
 
-        if remaining <= 2:
-            parent.status_update("Rate Limit approaching. Next message delay is 2 seconds.")
-            # already a 1 second delay between messages, so extra secound added here
-            time.sleep(1)
+    elif outcome == transport.FAILED:
+        # look into making a pop up dialogue instead
+        parent.status_update(detail)
 
 if __name__ == '__main__':
         app = QApplication(sys.argv)
+        # checks the dice in the background from the first roll
+        audit.start()
         Main()
         sys.exit(app.exec_())
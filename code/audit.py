@@ -0,0 +1,245 @@
+# Dice fairness audit created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import argparse
+import math
+import queue
+import threading
+from array import array
+import rng
+
+# blocks of faces making up the rolling window
+WINDOW_BLOCKS = 64
+
+# blocks waiting to be checked, any more are dropped rather than slowing the roller down
+QUEUE_SIZE = 256
+
+# p-values below this are reported as suspicious
+ALPHA = 0.001
+
+# maps faces to 1 for high (6-10) and 0 for low (1-5), for the runs test
+HIGH = bytes(1 if value > 5 else 0 for value in range(256))
+
+# per block counters: one count per face, then high faces, low faces and runs
+COUNTERS = 13
+(HIGHS, LOWS, RUNS) = range(10, COUNTERS)
+
+
+def chi_square_p(statistic, freedom=9):
+    '''
+    Chance of a chi-square statistic at least this big if the dice are fair.
+    Exact for odd degrees of freedom, which is all a d10 needs.
+    '''
+    if statistic <= 0:
+        return 1.0
+    root = math.sqrt(statistic)
+    p = math.erfc(root / math.sqrt(2))
+    term = root * math.sqrt(2 / math.pi) * math.exp(-statistic / 2)
+    for k in range(1, (freedom - 1) // 2 + 1):
+        p += term
+        term *= statistic / (2 * k + 1)
+    return min(p, 1.0)
+
+
+def chi_square(counts):
+    '''
+    Chi-square statistic of face counts against every face being equally likely.
+    '''
+    total = sum(counts)
+    if not total:
+        return 0.0
+    expected = total / len(counts)
+    return sum((count - expected) ** 2 for count in counts) / expected
+
+
+def runs_z(highs, lows, runs):
+    '''
+    Wald-Wolfowitz runs test on the high/low sequence of faces.
+    Too few runs means faces clump together, too many means they alternate.
+    Returns the z score, 0 if there isn't enough to test.
+    '''
+    total = highs + lows
+    if not highs or not lows or total < 2:
+        return 0.0
+    product = 2 * highs * lows
+    mean = product / total + 1
+    variance = product * (product - total) / (total * total * (total - 1))
+    if variance <= 0:
+        return 0.0
+    return (runs - mean) / math.sqrt(variance)
+
+
+def block_counts(faces):
+    '''
+    Counters for one block of faces.
+    '''
+    counts = array('Q', [0] * COUNTERS)
+    for value in range(1, 11):
+        counts[value - 1] = faces.count(value)
+
+    bits = faces.translate(HIGH)
+    counts[HIGHS] = bits.count(1)
+    counts[LOWS] = len(bits) - counts[HIGHS]
+
+    # a new run starts wherever neighbouring faces switch between high and low
+    if len(bits) > 1:
+        changes = int.from_bytes(bits[:-1], 'little') ^ int.from_bytes(bits[1:], 'little')
+        counts[RUNS] = bin(changes).count('1') + 1
+    elif bits:
+        counts[RUNS] = 1
+    return counts, bits[:1], bits[-1:]
+
+
+class Auditor:
+    '''
+    Checks every block of faces the dice draw, on a background thread.
+    Keeps running counters for all faces ever seen plus a rolling window of the last WINDOW_BLOCKS blocks,
+    so memory stays the same however long it runs.
+    '''
+
+    def __init__(self, window=WINDOW_BLOCKS):
+        self.window = window
+        self.blocks = queue.Queue(QUEUE_SIZE)
+        self.lock = threading.Lock()
+
+        self.totals = array('Q', [0] * COUNTERS)
+        self.window_totals = array('Q', [0] * COUNTERS)
+        # counters of each block in the window, oldest is overwritten first
+        self.ring = [array('Q', [0] * COUNTERS) for block in range(window)]
+        self.ring_index = 0
+
+        # last high/low bit seen, so runs carry on between blocks
+        self.last_bit = None
+        self.checked = 0
+        self.dropped = 0
+        self.thread = None
+
+    def feed(self, faces):
+        '''
+        Hands a block of faces to the audit thread. Called from the dice source, so it never waits.
+        '''
+        try:
+            self.blocks.put_nowait(faces)
+        except queue.Full:
+            self.dropped += 1
+
+    def check(self, faces):
+        '''
+        Adds a block of faces to the counters.
+        '''
+        counts, first, last = block_counts(faces)
+        if not last:
+            return
+
+        with self.lock:
+            # the first run of this block joins the last run of the previous block if they match
+            if self.last_bit is not None and first == self.last_bit:
+                counts[RUNS] -= 1
+            self.last_bit = last
+
+            oldest = self.ring[self.ring_index]
+            for index in range(COUNTERS):
+                self.totals[index] += counts[index]
+                self.window_totals[index] += counts[index] - oldest[index]
+            self.ring[self.ring_index] = counts
+            self.ring_index = (self.ring_index + 1) % self.window
+            self.checked += 1
+
+    def run(self):
+        while True:
+            faces = self.blocks.get()
+            if faces is None:
+                return
+            self.check(faces)
+
+    def start(self):
+        '''
+        Starts the audit thread and attaches it to every BufferedRNG.
+        '''
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="dice audit", daemon=True)
+            self.thread.start()
+        rng.BufferedRNG.auditor = self
+
+    def stop(self):
+        '''
+        Detaches from the dice and lets the thread finish the blocks already waiting.
+        '''
+        if rng.BufferedRNG.auditor is self:
+            rng.BufferedRNG.auditor = None
+        if self.thread is not None:
+            self.blocks.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def results(self):
+        '''
+        Test results for all faces and for the rolling window.
+        Returns a dict of dicts, each with faces, chi-square, chi-square p, runs z and runs p.
+        '''
+        out = {}
+        with self.lock:
+            for name, totals in (('total', self.totals), ('window', self.window_totals)):
+                counts = totals[:10]
+                statistic = chi_square(counts)
+                z = runs_z(totals[HIGHS], totals[LOWS], totals[RUNS])
+                out[name] = {'faces': sum(counts),
+                             'counts': list(counts),
+                             'chi-square': statistic,
+                             'chi-square p': chi_square_p(statistic),
+                             'runs z': z,
+                             'runs p': math.erfc(abs(z) / math.sqrt(2))}
+        return out
+
+    def lines(self):
+        '''
+        Summary of the audit as lines of text.
+        '''
+        results = self.results()
+        out = []
+        for name, title in (('total', "All faces"), ('window', "Last " + str(self.window) + " blocks")):
+            result = results[name]
+            out.append(title + ": " + str(result['faces']) + " faces")
+            if not result['faces']:
+                continue
+            out.append("  Faces 1-10: " + " ".join(format(count / result['faces'], '.1%')
+                                                   for count in result['counts']))
+            out.append("  Chi-square: " + format(result['chi-square'], '.2f')
+                       + " (p = " + format(result['chi-square p'], '.3f') + ")")
+            out.append("  Runs: z = " + format(result['runs z'], '.2f')
+                       + " (p = " + format(result['runs p'], '.3f') + ")")
+            if min(result['chi-square p'], result['runs p']) < ALPHA:
+                out.append("  Suspicious, keep watching: a fair die does this 1 time in " + str(int(1 / ALPHA)))
+            else:
+                out.append("  Consistent with fair dice")
+        if self.dropped:
+            out.append("Blocks skipped while busy: " + str(self.dropped))
+        return out
+
+
+# shared by the whole program, started by start()
+AUDITOR = Auditor()
+
+
+def start():
+    AUDITOR.start()
+    return AUDITOR
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the dice roller's faces for fairness.")
+    parser.add_argument('--faces', type=int, default=1000000, help="number of faces to draw")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--secure', action='store_true', help="use the operating system's random source")
+    args = parser.parse_args()
+
+    # large blocks so the audit thread keeps up
+    source = rng.SecureRNG(65536) if args.secure else rng.BufferedRNG(args.seed, 65536)
+    auditor = start()
+    remaining = args.faces
+    while remaining:
+        step = min(remaining, 65536)
+        source.faces(step)
+        remaining -= step
+    auditor.stop()
+    print("\n".join(auditor.lines()))
@@ -0,0 +1,71 @@
+# Batch rolls for many NPCs at once, created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import dice as engine
+import expression
+
+
+def roll_batch(entries, source=None):
+    '''
+    Rolls many labelled dice pools in one pass, without needing a Character.
+    entries: list of (label, pool, again, rote) tuples, a pool below 1 is rolled as a chance die
+    source: where faces are drawn from, defaults to the shared rng.DEFAULT
+    Returns a list of (label, RollResult) pairs in the same order.
+    '''
+    results = engine.roll_pools([(pool, again, rote) for label, pool, again, rote in entries], source)
+    return [(entry[0], result) for entry, result in zip(entries, results)]
+
+
+def summary(results, title="Batch roll"):
+    '''
+    Combines the results of a batch into a single message.
+    '''
+    total = 0
+    lines = [title + " (" + str(len(results)) + " pools):"]
+
+    for label, result in results:
+        if result.kind == 'chance':
+            line = label + " (chance die): " + str(result.faces[0])
+            if result.successes:
+                line += ", success"
+            elif result.botched:
+                line += ", botched"
+            else:
+                line += ", failed"
+        else:
+            line = label + " (" + str(result.dice) + " dice"
+            if result.again != 10:
+                line += ", " + str(result.again) + " again"
+            if result.rote:
+                line += ", rote"
+            line += "): " + str(result.successes) + " successes"
+        total += result.successes
+        lines.append(line)
+
+    lines.append("Total successes: " + str(total))
+    return "\n".join(lines)
+
+
+def parse_batch(text):
+    '''
+    Reads one pool per line, written as "label: pool", e.g. "Ghoul 1: 5 9again rote".
+    The pool is a dice expression using numbers only.
+    Raises ValueError naming the first line that can't be read.
+    Returns a list of (label, pool, again, rote) tuples.
+    '''
+    entries = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+
+        label, colon, pool = line.rpartition(':')
+        if not colon or not label.strip():
+            raise ValueError("Line " + str(number) + ": use label: pool")
+
+        try:
+            plan = expression.compile_expression(pool, {})
+        except ValueError as error:
+            raise ValueError("Line " + str(number) + ": " + str(error))
+
+        entries.append((label.strip(), plan.pool({}), plan.again, plan.rote))
+    return entries
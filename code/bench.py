@@ -0,0 +1,166 @@
+# Roll benchmarks created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import argparse
+import copy
+import json
+import platform
+import random
+import time
+import tracemalloc
+import history
+import rng
+import stats
+from player import Character
+
+# pools benchmarked by default, --pools can pick others from 1 to 100
+POOLS = (1, 2, 5, 10, 20, 50, 100)
+AGAINS = (10, 9, 8)
+
+# shortest time each case is timed for, in seconds
+MIN_TIME = 0.2
+
+# calls made while memory is traced, tracing slows everything down so this is kept small
+TRACED_CALLS = 200
+
+MESSAGES = ["Nice roll, [userID]!", "[userID] is on fire!"]
+
+
+def make_character(seed=None):
+    '''
+    A plain character with no splat, so the sheets and PyQt aren't needed.
+    '''
+    sheet = copy.deepcopy(stats.STATS)
+    for attribute in stats.ATTRIBUTES:
+        sheet[attribute] = 2
+    for skill in stats.SKILLS:
+        sheet[skill] = 1
+    sheet['user id'] = '<@0>'
+    sheet['webhook'] = ''
+
+    character = Character(stats=sheet, goodMessages=MESSAGES, badMessages=MESSAGES,
+                          goodrate=100, badrate=100, splat='mortal')
+    character.rng = rng.BufferedRNG(seed)
+    return character
+
+
+def personality(character, dice, again, rote):
+    '''
+    A roll followed by the personality message choice Dicecord makes, without sending anything.
+    '''
+    character.roll_set(dice, rote, again)
+    return character.personality_message(character.last_result.successes)
+
+
+def cases(character, pools):
+    '''
+    Every benchmark as (details, function) pairs, details is a dict describing the case.
+    '''
+    for again in AGAINS:
+        for rote in (False, True):
+            for quiet in (False, True):
+                for dice in pools:
+                    yield ({'name': 'roll_set', 'dice': dice, 'again': again, 'rote': rote, 'quiet': quiet},
+                           lambda dice=dice, again=again, rote=rote, quiet=quiet:
+                           character.roll_set(dice, rote, again, quiet))
+
+    yield {'name': 'roll_chance'}, character.roll_chance
+
+    for dice in pools:
+        yield ({'name': 'personality', 'dice': dice, 'again': 10, 'rote': False},
+               lambda dice=dice: personality(character, dice, 10, False))
+
+
+def time_case(function, min_time=MIN_TIME):
+    '''
+    Calls function in growing batches until a batch takes at least min_time.
+    Returns calls per second.
+    '''
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for call in range(calls):
+            function()
+        taken = time.perf_counter() - start
+        if taken >= min_time:
+            return calls / taken
+        calls *= 2
+
+
+def trace_case(function, calls=TRACED_CALLS):
+    '''
+    Memory used by function: blocks and bytes still held per call, and the peak in bytes while it runs.
+    '''
+    tracemalloc.start()
+
+    # fill the roll history and warm up caches while tracing, so rolls pushed out of the history are
+    # counted as freed and only real growth is left
+    for call in range(history.HISTORY_SIZE):
+        function()
+
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    for call in range(calls):
+        function()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    differences = after.compare_to(before, 'filename')
+    return {'retained blocks per call': sum(stat.count_diff for stat in differences) / calls,
+            'retained bytes per call': sum(stat.size_diff for stat in differences) / calls,
+            'peak bytes': peak}
+
+
+def run(pools=POOLS, seed=0, min_time=MIN_TIME, memory=True):
+    '''
+    Runs every benchmark.
+    Returns a dict ready to be written as JSON.
+    '''
+    random.seed(seed)
+    character = make_character(seed)
+
+    results = []
+    for details, function in cases(character, pools):
+        result = dict(details)
+        result['ops per sec'] = time_case(function, min_time)
+        if memory:
+            result.update(trace_case(function))
+        results.append(result)
+
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'seed': seed,
+            'min time': min_time,
+            'results': results}
+
+
+def pool_list(text):
+    '''
+    Reads --pools, e.g. "1,5,10" or "1-100".
+    '''
+    pools = []
+    for part in text.split(','):
+        first, dash, last = part.partition('-')
+        pools.extend(range(int(first), int(last or first) + 1))
+    if not all(1 <= dice <= 100 for dice in pools):
+        raise argparse.ArgumentTypeError("pools must be between 1 and 100")
+    return pools
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the dice roller without the UI.")
+    parser.add_argument('--pools', type=pool_list, default=POOLS, help="e.g. 1,5,10 or 1-100")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time', type=float, default=MIN_TIME, help="seconds each case is timed for")
+    parser.add_argument('--no-memory', action='store_true', help="skip tracing allocations")
+    parser.add_argument('--output', default=None, help="write JSON here instead of printing it")
+    args = parser.parse_args()
+
+    report = run(args.pools, args.seed, args.time, not args.no_memory)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,190 @@
+# Weapon attacks created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import dice as engine
+import player
+import rng
+
+# damage types, matching the positions in the health track
+BASHING = 1
+LETHAL = 2
+AGGRAVATED = 3
+
+DAMAGE_NAMES = {BASHING: 'bashing', LETHAL: 'lethal', AGGRAVATED: 'aggravated'}
+
+# used when attacking without a weapon
+UNARMED = {'damage': 0, 'range': '', 'clip': 0, 'init': 0, 'str': 0, 'size': 0}
+
+
+def name(combatant):
+    '''
+    Name of a combatant, either a Character's user id or a stat block's name.
+    '''
+    if isinstance(combatant, dict):
+        return combatant.get('name') or combatant['user id']
+    return combatant.stats['user id']
+
+
+def stat_block(combatant):
+    if isinstance(combatant, dict):
+        return combatant
+    return combatant.stats
+
+
+def get_weapon(attacker, weapon=None):
+    '''
+    Looks up a weapon on the attacker's sheet, None means unarmed.
+    Raises KeyError if the attacker doesn't have it.
+    Returns a dict with the same keys as UNARMED.
+    '''
+    if weapon is None:
+        return UNARMED
+
+    # weapons read from a save file are strings, and blank fields like a melee weapon's range aren't saved
+    details = stat_block(attacker)['weapons'][weapon]
+    out = {key: int(details.get(key, 0) or 0) for key in ('damage', 'clip', 'init', 'str', 'size')}
+    out['range'] = str(details.get('range', ''))
+    return out
+
+
+def is_ranged(details):
+    '''
+    Weapons with ranges listed, e.g. "20/40/80", are fired rather than swung.
+    '''
+    return any(character.isdigit() for character in details['range'])
+
+
+def attack_pool(attacker, target, weapon=None, modifier=0):
+    '''
+    Works out the dice pool for an attack.
+    Melee: Strength + Weaponry (Brawl unarmed) - target's Defense.
+    Ranged: Dexterity + Firearms, Defense doesn't apply.
+    Each point of Strength below the weapon's requirement is -1 die.
+    Returns the pool and a list of (reason, dice) pairs making it up.
+    '''
+    stats = stat_block(attacker)
+    details = get_weapon(attacker, weapon)
+
+    if is_ranged(details):
+        parts = [('dexterity', stats['dexterity']), ('firearms', stats['firearms'])]
+    else:
+        skill = 'brawl' if weapon is None else 'weaponry'
+        defense = stat_block(target)['defense'] + stat_block(target).get('defense mod', 0)
+        parts = [('strength', stats['strength']), (skill, stats[skill]), ('defense', -defense)]
+
+    shortfall = details['str'] - stats['strength']
+    if shortfall > 0:
+        parts.append(('strength requirement', -shortfall))
+
+    if modifier:
+        parts.append(('modifier', modifier))
+
+    return sum(dice for reason, dice in parts), parts
+
+
+def damage(result, details, target, damage_type):
+    '''
+    Damage an attack does: successes + weapon damage - target's armor, nothing on a miss.
+    Returns (amount, damage type).
+    '''
+    if not result.successes:
+        return 0, damage_type
+    amount = result.successes + details['damage'] - stat_block(target).get('armor', 0)
+    return max(amount, 0), damage_type
+
+
+def apply_damage(target, amount, damage_type):
+    '''
+    Writes damage into the target's health track.
+    '''
+    if not amount:
+        return
+    # stat blocks overflow into the next damage type just like characters do
+    player.change_health(stat_block(target)['health'], amount, damage_type)
+
+
+def attack(attacker, target, weapon=None, modifier=0, damage_type=None, source=None):
+    '''
+    Makes one attack, see attack_many.
+    '''
+    return attack_many([(attacker, target, weapon, modifier, damage_type)], source)[0]
+
+
+def attack_many(attacks, source=None):
+    '''
+    Resolves many attacks with every pool rolled in one batch, then marks the damage on each target.
+    attacks: list of (attacker, target, weapon, modifier, damage_type) tuples
+        attacker and target are Characters or stat block dicts
+        weapon is a name from the attacker's weapons, or None for unarmed
+        damage_type defaults to bashing unarmed and lethal with a weapon
+    source: where faces are drawn from, defaults to the shared rng.DEFAULT
+    Returns a list of dicts with the attacker, target, weapon, pool, parts, result, damage, damage type and health.
+    '''
+    planned = []
+    for attacker, target, weapon, modifier, damage_type in attacks:
+        pool, parts = attack_pool(attacker, target, weapon, modifier)
+        if damage_type is None:
+            damage_type = BASHING if weapon is None else LETHAL
+        planned.append((attacker, target, weapon, pool, parts, damage_type))
+
+    # a pool below 1 is rolled as a chance die
+    # a Character keeping a roll log needs its rolls drawn one at a time so they can be replayed
+    logged = any(not isinstance(attacker, dict) and attacker.roll_log
+                 for attacker, target, weapon, pool, parts, damage_type in planned)
+    # rolls are recorded against the source they were really drawn from, so the log can replay them
+    source = source or rng.DEFAULT
+    rolled = engine.roll_logged([(pool, 10, False) for attacker, target, weapon, pool, parts, damage_type in planned],
+                                source, logged)
+
+    out = []
+    for (attacker, target, weapon, pool, parts, damage_type), (result, offset) in zip(planned, rolled):
+        if not isinstance(attacker, dict):
+            attacker.record(result, offset, source)
+
+        amount, damage_type = damage(result, get_weapon(attacker, weapon), target, damage_type)
+        apply_damage(target, amount, damage_type)
+
+        out.append({'attacker': attacker,
+                    'target': target,
+                    'weapon': weapon,
+                    'pool': pool,
+                    'parts': parts,
+                    'result': result,
+                    'damage': amount,
+                    'damage type': damage_type,
+                    # health straight after this attack, later attacks in the batch may change it again
+                    'health': list(stat_block(target).get('health', ()))})
+    return out
+
+
+def summary(outcomes):
+    '''
+    One message covering every attack and the damage done.
+    '''
+    lines = []
+    for outcome in outcomes:
+        line = name(outcome['attacker']) + " attacks " + name(outcome['target'])
+        if outcome['weapon'] is None:
+            line += " unarmed"
+        else:
+            line += " with " + outcome['weapon']
+
+        result = outcome['result']
+        if result.kind == 'chance':
+            line += " (chance die): rolled " + str(result.faces[0])
+        else:
+            line += " (" + str(outcome['pool']) + " dice): " + str(result.successes) + " successes"
+
+        if not result.successes:
+            line += ", missed."
+        elif outcome['damage']:
+            line += ", " + str(outcome['damage']) + " " + DAMAGE_NAMES[outcome['damage type']] + " damage!"
+        else:
+            line += ", stopped by armor."
+        lines.append(line)
+
+        health = outcome['health']
+        if outcome['damage'] and health:
+            lines.append(name(outcome['target']) + " health: " + str(health[1]) + " bashing, " + str(health[2])
+                         + " lethal, " + str(health[3]) + " aggravated of " + str(health[0]))
+    return "\n".join(lines)
@@ -0,0 +1,153 @@
+# Contested roll resolver created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+from functools import lru_cache
+import dice as engine
+import odds
+import rng
+
+
+def contestant(character, expression):
+    '''
+    Makes a contest entry for a Character from a dice expression, e.g. "str+brawl" or "dex+athletics 9again".
+    Returns a (character, pool, again, rote) tuple.
+    '''
+    plan = character.plans.get(expression, character.stats)
+    return (character, plan.pool(character.stats), plan.again, plan.rote)
+
+
+def name(who):
+    '''
+    Name used for a contestant in messages, either a label or a Character's user id.
+    '''
+    if isinstance(who, str):
+        return who
+    return who.stats['user id']
+
+
+def success_chances(dice, again=10, rote=False, limit=None):
+    '''
+    Chance of each number of successes for a pool, less than 1 die is a chance die.
+    '''
+    if limit is None:
+        limit = odds.default_limit(max(dice, 1))
+    if dice < 1:
+        return (1 - odds.CHANCE_SUCCESS, odds.CHANCE_SUCCESS) + (0.0,) * (limit - 1)
+    return odds.distribution(dice, again, rote, limit)
+
+
+@lru_cache(maxsize=256)
+def win_chances(pools):
+    '''
+    Exact chance of each pool getting strictly more successes than all the others.
+    pools: tuple of (dice, again, rote) tuples
+    Returns a tuple with the chance each pool wins, followed by the chance of a tie for the most successes.
+    '''
+    # every pool is tracked to the same depth so the tails line up
+    limit = max(odds.default_limit(max(dice, 1)) for dice, again, rote in pools)
+    chances = [success_chances(dice, again, rote, limit) for dice, again, rote in pools]
+
+    # chance of each pool getting fewer than k successes
+    below = []
+    for chance in chances:
+        running = [0.0]
+        for p in chance:
+            running.append(running[-1] + p)
+        below.append(running)
+
+    out = []
+    for index, chance in enumerate(chances):
+        total = 0.0
+        for successes, p in enumerate(chance):
+            if not p:
+                continue
+            for other, running in enumerate(below):
+                if other != index:
+                    p *= running[successes]
+            total += p
+        out.append(total)
+
+    out.append(max(0.0, 1 - sum(out)))
+    return tuple(out)
+
+
+def resolve(entries, source=None):
+    '''
+    Resolves one contest between two or more contestants, the most successes wins and a tie has no winner.
+    entries: list of (contestant, pool, again, rote), a contestant is a label or a Character
+    source: where faces are drawn from, defaults to the shared rng.DEFAULT
+    Returns a (winner, results, chances) tuple, see resolve_many.
+    '''
+    return resolve_many([entries], source)[0]
+
+
+def resolve_many(contests, source=None):
+    '''
+    Resolves several contests with every pool rolled in a single batch.
+    contests: list of entry lists, as used by resolve
+    Returns a list of (winner, results, chances) tuples, one per contest:
+    winner is the winning contestant or None for a tie, results is a list of (contestant, RollResult)
+    pairs and chances is the tuple from win_chances.
+    '''
+    pools = [(pool, again, rote) for entries in contests for who, pool, again, rote in entries]
+    # a Character keeping a roll log needs its rolls drawn one at a time so they can be replayed
+    logged = any(not isinstance(who, str) and who.roll_log
+                 for entries in contests for who, pool, again, rote in entries)
+    # rolls are recorded against the source they were really drawn from, so the log can replay them
+    source = source or rng.DEFAULT
+    rolled = iter(engine.roll_logged(pools, source, logged))
+
+    out = []
+    for entries in contests:
+        results = []
+        for entry in entries:
+            result, offset = next(rolled)
+            results.append((entry[0], result))
+
+            # rolls made by a Character are kept in its history, statistics and roll log
+            if not isinstance(entry[0], str):
+                entry[0].record(result, offset, source)
+
+        best = max(result.successes for who, result in results)
+        leaders = [who for who, result in results if result.successes == best]
+        winner = leaders[0] if len(leaders) == 1 else None
+
+        chances = win_chances(tuple((pool, again, rote) for who, pool, again, rote in entries))
+        out.append((winner, results, chances))
+    return out
+
+
+def resolve_against(attackers, defender, source=None):
+    '''
+    Many attackers each contesting the same target, e.g. a mob against one character.
+    The defender rolls separately against every attacker, all in one batch.
+    attackers: list of entries, as used by resolve
+    defender: a single entry
+    '''
+    return resolve_many([[attacker, defender] for attacker in attackers], source)
+
+
+def summary(contests, title="Contested roll"):
+    '''
+    Combines the outcome of one or more contests into a single message.
+    '''
+    lines = [title + ":"]
+
+    for winner, results, chances in contests:
+        rolls = []
+        for (who, result), chance in zip(results, chances):
+            if result.kind == 'chance':
+                rolls.append(name(who) + " (chance die) " + str(result.successes)
+                             + " [" + format(chance, '.0%') + "]")
+            else:
+                rolls.append(name(who) + " (" + str(result.dice) + " dice) " + str(result.successes)
+                             + " [" + format(chance, '.0%') + "]")
+        line = " vs ".join(rolls)
+
+        if winner is None:
+            line += " - tie [" + format(chances[-1], '.0%') + "]"
+        else:
+            line += " - " + name(winner) + " wins"
+        lines.append(line)
+
+    return "\n".join(lines)
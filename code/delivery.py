@@ -0,0 +1,198 @@
+# Asynchronous webhook delivery created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import ratelimit
+import transport
+
+# messages being posted at once, each on one of transport.POOL's kept alive connections
+CONNECTIONS = 2
+
+# seconds between messages to the same webhook, as the roller has always waited
+DELAY = 1
+
+
+def split_webhook(webhook):
+    '''
+    Returns (host, path) for a webhook, which can be a full URL or a path on transport.HOST.
+    '''
+    parts = urlsplit(webhook)
+    if not parts.netloc:
+        return transport.HOST, webhook
+
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return parts.netloc, path
+
+
+class DeliveryEngine:
+    '''
+    Posts messages to many webhooks at once.
+    Each webhook has its own queue, so its messages keep their order, while different webhooks are sent to
+    concurrently. The requests themselves go through a transport.ConnectionPool on a few threads, so waiting on
+    the network or the rate limit never holds up the other webhooks.
+    Must be used from the event loop it is running on, see BackgroundDelivery for use from other threads.
+    '''
+
+    def __init__(self, connections=CONNECTIONS, pool=None):
+        '''
+        pool: the transport.ConnectionPool requests are sent on, defaults to transport.POOL
+        '''
+        self.pool = pool or transport.POOL
+        self.executor = ThreadPoolExecutor(connections, thread_name_prefix="webhook post")
+
+        # webhook -> (queue of jobs, task sending them)
+        self.queues = {}
+
+    async def post(self, webhook, message, status):
+        '''
+        Sends one message, waiting and trying again if rate limited.
+        Returns False if it could not be sent.
+        '''
+        host, path = split_webhook(webhook)
+        payload, headers = transport.form(message)
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # waits until the webhook's rate limit has room, shared with Dicecord.send, see ratelimit.py
+            wait = ratelimit.LIMITER.reserve(webhook)
+            if wait > 0:
+                status("Rate limit reached. Next message in " + str(wait)[:4] + " seconds.")
+                await asyncio.sleep(wait)
+
+            try:
+                response, text = await loop.run_in_executor(self.executor, self.pool.request,
+                                                            "POST", path, payload, headers, host)
+            except transport.ERRORS as error:
+                ratelimit.LIMITER.release(webhook)
+                status("Could not send message: " + str(error))
+                return False
+
+            ratelimit.LIMITER.update(webhook, response.headers)
+
+            outcome, detail = transport.read_response(response.status, text)
+            if outcome == transport.RATE_LIMITED:
+                status("Rate limit hit. Will try again in " + str(detail)[:4] + " seconds.")
+                ratelimit.LIMITER.limited(webhook, detail)
+                continue
+
+            if outcome == transport.FAILED:
+                status(detail)
+                return False
+            return True
+
+    async def worker(self, webhook, jobs):
+        while True:
+            messages, status, delay, done, finished = await jobs.get()
+            sent = 0
+            for message in messages:
+                sent += await self.post(webhook, message, status)
+                if delay:
+                    await asyncio.sleep(delay)
+            if done:
+                status(done)
+            if not finished.done():
+                finished.set_result(sent)
+            jobs.task_done()
+
+    def deliver(self, messages, webhook, status=None, delay=DELAY, done=None):
+        '''
+        Queues messages for a webhook, must be called on the engine's event loop.
+        :param status: function called with status updates, defaults to ignoring them
+        :param delay: seconds waited after each message
+        :param done: status given once every message is sent
+        Returns a future giving the number of messages sent.
+        '''
+        loop = asyncio.get_running_loop()
+        if webhook not in self.queues:
+            jobs = asyncio.Queue()
+            self.queues[webhook] = (jobs, loop.create_task(self.worker(webhook, jobs)))
+
+        finished = loop.create_future()
+        self.queues[webhook][0].put_nowait((messages, status or (lambda message: None), delay, done, finished))
+        return finished
+
+    async def drain(self):
+        '''
+        Waits until every queued message is sent.
+        '''
+        await asyncio.gather(*(jobs.join() for jobs, task in self.queues.values()))
+
+    async def close(self):
+        '''
+        Stops the webhook queues and the threads posting for them.
+        '''
+        for jobs, task in self.queues.values():
+            task.cancel()
+        await asyncio.gather(*(task for jobs, task in self.queues.values()), return_exceptions=True)
+        self.queues = {}
+        self.executor.shutdown(wait=False)
+
+
+class BackgroundDelivery:
+    '''
+    Runs a DeliveryEngine on an event loop in its own thread, so the Qt client or any blocking code
+    can hand it messages without waiting. Status functions are called on the delivery thread,
+    Qt code should pass something that emits a signal, like Dicecord's Status_Relay.status_update.
+    '''
+
+    def __init__(self, connections=CONNECTIONS, pool=None):
+        self.loop = asyncio.new_event_loop()
+        self.engine = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(connections, pool), name="webhook delivery",
+                                       daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def run(self, connections, pool):
+        asyncio.set_event_loop(self.loop)
+        self.engine = DeliveryEngine(connections, pool)
+        self.ready.set()
+        self.loop.run_forever()
+
+    def deliver(self, messages, webhook, status=None, delay=DELAY, done=None):
+        '''
+        Queues messages from any thread.
+        Returns a concurrent.futures.Future giving the number of messages sent.
+        '''
+        async def queue():
+            return await self.engine.deliver(messages, webhook, status, delay, done)
+        return asyncio.run_coroutine_threadsafe(queue(), self.loop)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.engine.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+async def post_many(jobs, connections=CONNECTIONS, delay=DELAY, status=print, pool=None):
+    '''
+    Sends several webhooks their messages at the same time, e.g. a GM posting for many characters.
+    jobs: list of (webhook, list of messages)
+    Returns the number of messages sent to each webhook, in the same order.
+    '''
+    engine = DeliveryEngine(connections, pool)
+    try:
+        futures = [engine.deliver(messages, webhook, status, delay) for webhook, messages in jobs]
+        return await asyncio.gather(*futures)
+    finally:
+        await engine.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Post messages to Discord webhooks.")
+    parser.add_argument('webhook', nargs='+', help="webhook URLs, every one gets all the messages")
+    parser.add_argument('--message', action='append', required=True, help="message to send, can be repeated")
+    parser.add_argument('--delay', type=float, default=DELAY, help="seconds between messages to a webhook")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    counts = asyncio.run(post_many([(webhook, args.message) for webhook in args.webhook], delay=args.delay))
+    print("Sent " + str(sum(counts)) + " messages in " + format(time.monotonic() - start, '.1f') + " seconds.")
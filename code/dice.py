@@ -0,0 +1,286 @@
+# Chronicles of Darkness dice engine created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import rng
+from array import array
+
+# possible faces of a d10
+FACES = range(1, 11)
+
+# lowest face that counts as a success
+SUCCESS = 8
+
+# per die flags stored alongside each face
+EXPLODED = 1
+ROTE = 2
+
+# text of each face, so messages don't call str() for every die
+FACE_TEXT = [str(value) for value in range(11)]
+
+# how each die is written in a quiet mode summary, by its flags
+# rote dice that exploded are shown as explosions
+SUMMARY_FORMAT = {0: " {}",
+                  EXPLODED: "({})",
+                  ROTE: " Rote:{}",
+                  EXPLODED | ROTE: "({})"}
+
+
+def roll_faces(count, source=None):
+    '''
+    Rolls a number of d10s in one call.
+    source: where faces are drawn from, defaults to the shared rng.DEFAULT
+    Returns an array of faces.
+    '''
+    return (source or rng.DEFAULT).faces(count)
+
+
+def count_successes(faces):
+    '''
+    Counts the faces at or above the success threshold.
+    '''
+    return sum(faces.count(value) for value in range(SUCCESS, 11))
+
+
+def roll_waves(counts, agains, source=None):
+    '''
+    Rolls several groups of dice and all of their explosions.
+    Each wave of explosions is drawn in a single call shared by every group.
+    counts: list of int, number of dice in each group
+    agains: list of int, which die faces explode in each group
+    source: where faces are drawn from
+    Returns a list with, for each group, the list of its waves: first the dice rolled, then one wave per level of explosions.
+    '''
+    waves = [[] for count in counts]
+    pending = list(counts)
+
+    while any(pending):
+        drawn = roll_faces(sum(pending), source)
+        start = 0
+        for group, count in enumerate(pending):
+            if count:
+                wave = drawn[start:start + count]
+                start += count
+                waves[group].append(wave)
+                pending[group] = sum(wave.count(value) for value in range(agains[group], 11))
+
+    return waves
+
+
+def order_chains(waves, again, flag=0):
+    '''
+    Puts the waves of one group back in the order they would be rolled one at a time:
+    each die is followed directly by the chain of dice it exploded into.
+    Returns two arrays: the faces and the flags of each die.
+    '''
+    if not waves:
+        return array('B'), array('B')
+
+    if len(waves) == 1:
+        # nothing exploded, no need to reorder
+        return waves[0], array('B', [flag]) * len(waves[0])
+
+    # each wave is consumed in order by the dice that exploded in the wave before it
+    faces = array('B')
+    flags = array('B')
+    position = [0] * len(waves)
+    for value in waves[0]:
+        faces.append(value)
+        flags.append(flag)
+        depth = 0
+        while value >= again:
+            depth += 1
+            value = waves[depth][position[depth]]
+            position[depth] += 1
+            faces.append(value)
+            flags.append(flag | EXPLODED)
+
+    return faces, flags
+
+
+def roll_chains(count, again, flag=0, source=None):
+    '''
+    Rolls a number of dice and all of their explosions.
+    count: int, number of dice to roll
+    again: int, which die faces explode
+    flag: int, flags applied to every die rolled
+    source: where faces are drawn from
+    Returns two arrays: the faces and the flags of each die.
+    '''
+    return order_chains(roll_waves([count], [again], source)[0], again, flag)
+
+
+class RollResult:
+    '''
+    Compact record of a single roll.
+    Faces and per die flags are kept in arrays, message text is only built when asked for.
+    '''
+
+    __slots__ = ('kind', 'dice', 'again', 'rote', 'faces', 'flags', 'successes', 'views')
+
+    def __init__(self, kind, dice, again, rote, faces, flags):
+        '''
+        kind: str, 'set' for a dice pool or 'chance' for a chance die
+        dice: int, the number of dice in the pool
+        again: int, which die faces exploded
+        rote: boolean, whether failed dice were rerolled
+        faces: array of each die face in roll order
+        flags: array of EXPLODED/ROTE flags for each face
+        '''
+        self.kind = kind
+        self.dice = dice
+        self.again = again
+        self.rote = rote
+        self.faces = faces
+        self.flags = flags
+
+        if kind == 'chance':
+            # only a 10 succeeds on a chance die
+            self.successes = int(faces[0] == 10)
+        else:
+            self.successes = count_successes(faces)
+
+        # rendered messages, only filled in when a message is asked for
+        self.views = None
+
+    def __len__(self):
+        return len(self.faces)
+
+    @property
+    def explosions(self):
+        '''
+        Number of dice rolled because another die exploded.
+        '''
+        return self.flags.count(EXPLODED) + self.flags.count(EXPLODED | ROTE)
+
+    @property
+    def botched(self):
+        '''
+        A chance die that lands on 1 is a dramatic failure.
+        '''
+        return self.kind == 'chance' and self.faces[0] == 1
+
+    def view(self, name, user):
+        '''
+        Returns a rendered message, building it the first time it is asked for.
+        name: 'lines' or 'summary'
+        user: str, the user id that is named in the messages
+        '''
+        if self.views is None:
+            self.views = {}
+
+        key = (name, user)
+        if key not in self.views:
+            if name == 'lines':
+                self.views[key] = self.render_lines(user)
+            else:
+                self.views[key] = self.render_summary(user)
+        return self.views[key]
+
+    def lines(self, user):
+        '''
+        One message per die, stating its value and whether it was exploded or rote.
+        user: str, the user id that is named in each message
+        '''
+        return self.view('lines', user)
+
+    def summary(self, user):
+        '''
+        Single message stating the successes followed by every die, as used in quiet mode.
+        Exploded dice are shown in brackets after the die they came from, rote rerolls are marked Rote.
+        user: str, the user id that is named in the message
+        '''
+        return self.view('summary', user)
+
+    def render_lines(self, user):
+        if self.kind == 'chance':
+            return [user + " rolled a chance die: " + FACE_TEXT[self.faces[0]]]
+
+        prefixes = {0: user + " rolled ",
+                    EXPLODED: user + " rolled exploded die: ",
+                    ROTE: user + " rolled rote die: ",
+                    EXPLODED | ROTE: user + " rolled rote exploded die: "}
+        return [prefixes[flag] + FACE_TEXT[value] for value, flag in zip(self.faces, self.flags)]
+
+    def render_summary(self, user):
+        parts = [user + " rolled " + str(self.dice) + " dice and got " + str(self.successes) + " successes."]
+        parts.extend(SUMMARY_FORMAT[flag].format(FACE_TEXT[value]) for value, flag in zip(self.faces, self.flags))
+        return ''.join(parts)
+
+
+def roll_pool(dice, again=10, rote=False, source=None):
+    '''
+    Rolls a full dice pool following the same rules as Character.roll_set.
+    dice: int, the number of dice to roll
+    again: int, which die faces explode
+    rote: boolean, a rote roll rerolls all failed dice once
+    source: where faces are drawn from
+    Returns a RollResult.
+    '''
+
+    return roll_pools([(dice, again, rote)], source)[0]
+
+
+def roll_chance(source=None):
+    '''
+    Rolls a chance die, which never explodes.
+    source: where faces are drawn from
+    Returns a RollResult.
+    '''
+    return RollResult('chance', 1, 11, False, roll_faces(1, source), array('B', [0]))
+
+
+def roll_pools(pools, source=None):
+    '''
+    Rolls many dice pools together, sharing one draw per wave of dice between all of them.
+    pools: list of (dice, again, rote) tuples, a pool of less than 1 die is rolled as a chance die
+    source: where faces are drawn from
+    Returns a list of RollResults in the same order as pools.
+    '''
+    # a chance die is a single die that never explodes
+    counts = [dice if dice >= 1 else 1 for dice, again, rote in pools]
+    agains = [again if dice >= 1 else 11 for dice, again, rote in pools]
+    first = roll_waves(counts, agains, source)
+
+    # rote pools reroll every die whose first face failed, again all in one set of waves
+    fails = []
+    for (dice, again, rote), waves in zip(pools, first):
+        if rote and dice >= 1:
+            fails.append(dice - count_successes(waves[0]))
+        else:
+            fails.append(0)
+    rerolls = roll_waves(fails, agains, source)
+
+    results = []
+    for index, (dice, again, rote) in enumerate(pools):
+        if dice < 1:
+            results.append(RollResult('chance', 1, 11, False, first[index][0], array('B', [0])))
+            continue
+
+        faces, flags = order_chains(first[index], again)
+        if fails[index]:
+            rote_faces, rote_flags = order_chains(rerolls[index], again, ROTE)
+            faces.extend(rote_faces)
+            flags.extend(rote_flags)
+        results.append(RollResult('set', dice, again, rote, faces, flags))
+
+    return results
+
+
+def roll_logged(pools, source=None, logged=False):
+    '''
+    Rolls pools like roll_pools, but if logged each pool is drawn on its own, one after another, so every roll
+    can be replayed from its offset in the source, see rolllog.replay.
+    Returns a list of (RollResult, offset) pairs, offset is None when not logged.
+    '''
+    if not logged:
+        return [(result, None) for result in roll_pools(pools, source)]
+
+    source = source or rng.DEFAULT
+    out = []
+    for dice, again, rote in pools:
+        offset = source.position
+        if dice < 1:
+            out.append((roll_chance(source), offset))
+        else:
+            out.append((roll_pool(dice, again, rote, source), offset))
+    return out
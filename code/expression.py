@@ -0,0 +1,151 @@
+# Dice expression compiler created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import re
+import stats
+
+# short names players can use for attributes
+ALIASES = {'int': 'intelligence',
+           'res': 'resolve',
+           'str': 'strength',
+           'dex': 'dexterity',
+           'sta': 'stamina',
+           'pre': 'presence',
+           'man': 'manipulation',
+           'com': 'composure',
+           'wp': 'willpower'}
+
+AGAIN = re.compile(r'\b(8|9|10)[ -]?again\b')
+ROTE = re.compile(r'\brote\b')
+TERM = re.compile(r'([+-])\s*([^+-]+)')
+
+# number of compiled plans each character keeps
+PLAN_CACHE_SIZE = 64
+
+
+class RollPlan:
+    '''
+    A compiled dice expression such as "dex+firearms+2 9again rote".
+    The pool is only worked out again when one of the stats it uses has changed.
+    '''
+
+    __slots__ = ('expression', 'terms', 'modifier', 'again', 'rote', 'values', 'total')
+
+    def __init__(self, expression, terms, modifier, again, rote):
+        '''
+        expression: str, the text the plan was compiled from
+        terms: tuple of (sign, stat name) pairs
+        modifier: int, sum of all plain numbers in the expression
+        again: int, which die faces explode
+        rote: boolean, whether it is a rote roll
+        '''
+        self.expression = expression
+        self.terms = terms
+        self.modifier = modifier
+        self.again = again
+        self.rote = rote
+
+        # stat values the pool was last worked out from
+        self.values = None
+        self.total = 0
+
+    def pool(self, character_stats):
+        '''
+        Dice pool for a character's current stats.
+        '''
+        values = tuple(character_stats[name] for sign, name in self.terms)
+        if values != self.values:
+            self.values = values
+            self.total = self.modifier + sum(sign * int(value) for (sign, name), value in zip(self.terms, values))
+        return self.total
+
+    def roll(self, character, quiet=False):
+        '''
+        Rolls the plan for a character, using a chance die if the pool drops below 1.
+        Returns the same list of messages as Character.roll_set or Character.roll_chance.
+        '''
+        dice = self.pool(character.stats)
+        if dice < 1:
+            return character.roll_chance()
+        return character.roll_set(dice, self.rote, self.again, quiet)
+
+
+def find_stat(name, character_stats):
+    '''
+    Matches a name in an expression to a stat, allowing aliases and _ in place of spaces.
+    '''
+    name = ' '.join(name.replace('_', ' ').split())
+    name = ALIASES.get(name, name)
+
+    if name in character_stats and type(character_stats[name]) is int:
+        return name
+
+    # allow an unambiguous start of a skill or attribute, e.g. "inv" for investigation
+    matches = [stat for stat in stats.SKILLS + stats.ATTRIBUTES
+               if stat.startswith(name) and stat in character_stats]
+    if len(matches) == 1:
+        return matches[0]
+
+    raise ValueError("Unknown stat: " + name)
+
+
+def compile_expression(expression, character_stats):
+    '''
+    Turns a dice expression into a RollPlan.
+    expression: str, e.g. "wits + composure - 1 8again"
+    character_stats: stats dict used to check the names used
+    '''
+    text = expression.lower()
+
+    again = 10
+    match = AGAIN.search(text)
+    if match:
+        again = int(match.group(1))
+    text = AGAIN.sub(' ', text)
+
+    rote = bool(ROTE.search(text))
+    text = ROTE.sub(' ', text).strip()
+
+    if not text:
+        raise ValueError("No dice in expression.")
+
+    if text[0] not in '+-':
+        text = '+' + text
+
+    terms = []
+    modifier = 0
+    position = 0
+    for match in TERM.finditer(text):
+        if text[position:match.start()].strip():
+            break
+        position = match.end()
+        sign = 1 if match.group(1) == '+' else -1
+        term = match.group(2).strip()
+        if term.isdigit():
+            modifier += sign * int(term)
+        else:
+            terms.append((sign, find_stat(term, character_stats)))
+
+    if text[position:].strip():
+        raise ValueError("Could not read: " + text[position:].strip())
+
+    return RollPlan(expression, tuple(terms), modifier, again, rote)
+
+
+class PlanCache:
+    '''
+    Compiled plans for one character, looked up by expression text.
+    The oldest plan is dropped once PLAN_CACHE_SIZE is reached.
+    '''
+
+    def __init__(self):
+        self.plans = {}
+
+    def get(self, expression, character_stats):
+        plan = self.plans.get(expression)
+        if plan is None:
+            plan = compile_expression(expression, character_stats)
+            if len(self.plans) >= PLAN_CACHE_SIZE:
+                del self.plans[next(iter(self.plans))]
+            self.plans[expression] = plan
+        return plan
@@ -0,0 +1,57 @@
+# Extended action rolls created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import dice as engine
+import odds
+
+
+def roll_extended(dice, target, limit, again=10, rote=False, source=None, logged=False):
+    '''
+    Rolls a whole extended action at once: the same pool, up to limit times, until target successes are reached.
+    Every roll is drawn in one batch and only the rolls needed to reach the target are kept.
+    dice: int, the pool rolled each time, less than 1 rolls a chance die
+    target: int, successes needed
+    limit: int, the most rolls allowed
+    logged: draw each roll on its own so it can be replayed, see dice.roll_logged
+    Returns the list of (RollResult, offset) pairs that were used, offsets are None unless logged.
+    '''
+    rolled = engine.roll_logged([(dice, again, rote)] * limit, source, logged)
+
+    total = 0
+    for count, (result, offset) in enumerate(rolled, 1):
+        total += result.successes
+        if total >= target:
+            return rolled[:count]
+    return rolled
+
+
+def summary(user, dice, target, limit, results, again=10, rote=False):
+    '''
+    Single message describing a whole extended action and the odds it had.
+    '''
+    total = sum(result.successes for result in results)
+
+    out = user + " made an extended action: "
+    if dice < 1:
+        out += "chance die"
+    else:
+        out += str(dice) + " dice"
+        if again != 10:
+            out += ", " + str(again) + " again"
+        if rote:
+            out += ", rote"
+    out += ", target " + str(target) + ", limit " + str(limit) + " rolls.\n"
+
+    out += "Rolls: " + " ".join(str(result.successes) for result in results) + "\n"
+
+    if total >= target:
+        out += "Reached " + str(total) + "/" + str(target) + " successes after " + str(len(results)) + " rolls!"
+    else:
+        out += "Only reached " + str(total) + "/" + str(target) + " successes in " + str(len(results)) + " rolls."
+
+    # odds of finishing at all, and of finishing this quickly
+    chances = odds.extended_distribution(dice, target, limit, again, rote)
+    out += "\nChance to finish within the limit: " + format(sum(chances), '.0%')
+    if total >= target:
+        out += ", within " + str(len(results)) + " rolls: " + format(sum(chances[:len(results) + 1]), '.0%')
+    return out
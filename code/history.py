@@ -0,0 +1,99 @@
+# Roll history created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+from collections import deque
+
+# number of rolls each character remembers
+HISTORY_SIZE = 100
+
+# RollResult attributes that rolls can be looked up by
+INDEXED = ('kind', 'again', 'rote', 'successes')
+
+
+class RollHistory:
+    '''
+    Fixed size ring buffer of the most recent RollResults.
+    Each indexed attribute value keeps a queue of the rolls that have it, so looking up the latest k rolls
+    of one kind only touches those k rolls. Memory stays the same however many rolls are made.
+    '''
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.size = size
+        self.slots = [None] * size
+
+        # total rolls ever added, also the sequence number of the next roll
+        self.count = 0
+
+        # (attribute, value) -> deque of sequence numbers, oldest first
+        self.index = {}
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def add(self, result):
+        '''
+        Stores a roll, pushing out the oldest one once the buffer is full.
+        '''
+        slot = self.count % self.size
+        old = self.slots[slot]
+
+        if old is not None:
+            # the roll being replaced is the oldest in every queue it is part of
+            for name in INDEXED:
+                key = (name, getattr(old, name))
+                queue = self.index[key]
+                queue.popleft()
+                if not queue:
+                    del self.index[key]
+
+        self.slots[slot] = result
+        for name in INDEXED:
+            self.index.setdefault((name, getattr(result, name)), deque()).append(self.count)
+        self.count += 1
+
+    def latest(self, k=1, **filters):
+        '''
+        Returns up to k of the most recent rolls, newest first.
+        Filters are attribute=value pairs from INDEXED, e.g. latest(5, rote=True).
+        '''
+        for name in filters:
+            if name not in INDEXED:
+                raise ValueError("Rolls can't be looked up by " + name + ".")
+
+        if filters:
+            # walk the shortest matching queue, checking the other filters on the way
+            sequence = min((self.index.get(key, ()) for key in filters.items()), key=len)
+        else:
+            sequence = range(self.count - len(self), self.count)
+
+        out = []
+        for number in reversed(sequence):
+            result = self.slots[number % self.size]
+            if all(getattr(result, name) == value for name, value in filters.items()):
+                out.append(result)
+                if len(out) == k:
+                    break
+        return out
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.count = 0
+        self.index = {}
+
+
+def describe(result):
+    '''
+    One line summary of a roll, without the individual dice.
+    '''
+    if result.kind == 'chance':
+        out = "Chance die: " + str(result.faces[0])
+        if result.successes:
+            return out + ", success"
+        elif result.botched:
+            return out + ", botched"
+        return out + ", failed"
+
+    out = str(result.dice) + " dice, " + str(result.again) + " again"
+    if result.rote:
+        out += ", rote"
+    return out + ": " + str(result.successes) + " successes"
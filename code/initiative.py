@@ -0,0 +1,164 @@
+# Initiative tracker created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import heapq
+import itertools
+import dice as engine
+
+
+def name(combatant):
+    '''
+    Name of a combatant: a Character's user id, a stat block's name or a (label, modifier) tuple's label.
+    '''
+    if isinstance(combatant, tuple):
+        return combatant[0]
+    if isinstance(combatant, dict):
+        return combatant.get('name') or combatant['user id']
+    return combatant.stats['user id']
+
+
+def modifier(combatant):
+    '''
+    Initiative modifier of a combatant, initiative plus any initiative mod.
+    Stat blocks without an initiative work it out from dexterity + composure.
+    '''
+    if isinstance(combatant, tuple):
+        return combatant[1]
+    if isinstance(combatant, dict):
+        block = combatant
+    else:
+        block = combatant.stats
+
+    if 'initiative' in block:
+        base = block['initiative']
+    else:
+        base = block['dexterity'] + block['composure']
+    return base + block.get('initiative mod', 0)
+
+
+class InitiativeTracker:
+    '''
+    Turn order for a fight, kept in a heap so combatants can join or drop out in O(log n).
+    Dropped combatants are only marked as removed and are cleared out when they reach the top of the heap.
+    '''
+
+    def __init__(self, source=None):
+        '''
+        source: where faces are drawn from, defaults to the shared rng.DEFAULT
+        '''
+        self.source = source
+
+        # entries are [sort key, name, roll, modifier, active], highest total first
+        self.heap = []
+
+        # name -> entry, for finding a combatant to remove
+        self.entries = {}
+
+        # keeps the order combatants joined in, used to settle ties
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, label):
+        return label in self.entries
+
+    def add(self, combatants):
+        '''
+        Rolls initiative for every combatant with one draw of d10s and puts them in the turn order.
+        A combatant that is already in the order is rerolled.
+        combatants: list of Characters, stat block dicts or (label, modifier) tuples
+        Returns a list of (name, roll, modifier) tuples in the same order.
+        '''
+        rolls = engine.roll_faces(len(combatants), self.source)
+
+        out = []
+        for combatant, roll in zip(combatants, rolls):
+            label = name(combatant)
+            mod = modifier(combatant)
+            self.insert(label, roll, mod)
+            out.append((label, roll, mod))
+        return out
+
+    def insert(self, label, roll, mod):
+        '''
+        Puts a combatant in the turn order with an initiative roll that has already been made.
+        Ties go to the higher modifier, then whoever joined first.
+        '''
+        if label in self.entries:
+            self.remove(label)
+
+        entry = [(-(roll + mod), -mod, next(self.counter)), label, roll, mod, True]
+        self.entries[label] = entry
+        heapq.heappush(self.heap, entry)
+
+    def remove(self, label):
+        '''
+        Drops a combatant from the turn order.
+        Raises KeyError if they are not in it.
+        '''
+        entry = self.entries.pop(label)
+        entry[-1] = False
+
+        # clear out removed entries sitting at the top so the heap doesn't fill with them
+        while self.heap and not self.heap[0][-1]:
+            heapq.heappop(self.heap)
+
+    def first(self):
+        '''
+        Returns (name, total) of whoever acts first, or None if nobody is in the order.
+        '''
+        if not self.heap:
+            return None
+        entry = self.heap[0]
+        return entry[1], entry[2] + entry[3]
+
+    def order(self):
+        '''
+        Returns the turn order as a list of (name, roll, modifier) tuples.
+        '''
+        entries = sorted(entry for entry in self.heap if entry[-1])
+
+        # only rebuild the heap once removed entries make up most of it
+        if len(self.heap) > 2 * len(entries):
+            self.heap = entries
+
+        return [(label, roll, mod) for key, label, roll, mod, active in entries]
+
+    def clear(self):
+        self.heap = []
+        self.entries = {}
+
+    def summary(self, title="Initiative"):
+        '''
+        Turn order as a single message.
+        '''
+        lines = [title + ":"]
+        for position, (label, roll, mod) in enumerate(self.order(), 1):
+            lines.append(str(position) + ". " + label + ": " + str(roll + mod)
+                         + " (rolled " + str(roll) + (" + " if mod >= 0 else " - ") + str(abs(mod)) + ")")
+        return "\n".join(lines)
+
+
+def parse_combatants(text):
+    '''
+    Reads one combatant per line, written as "label: modifier", e.g. "Ghoul 1: 5".
+    Raises ValueError naming the first line that can't be read.
+    Returns a list of (label, modifier) tuples.
+    '''
+    combatants = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+
+        label, colon, mod = line.rpartition(':')
+        if not colon or not label.strip():
+            raise ValueError("Line " + str(number) + ": use label: modifier")
+
+        try:
+            mod = int(mod)
+        except ValueError:
+            raise ValueError("Line " + str(number) + ": modifier must be a number")
+
+        combatants.append((label.strip(), mod))
+    return combatants
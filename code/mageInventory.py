@@ -10,6 +10,7 @@ from PyQt5.QtCore import *
 import basicUI
 import mageUI
 import player
+import odds
 import sys
 
 class InventorySheet(QWidget):
@@ -134,6 +135,8 @@ class Praxes(QWidget):
             # pool
             pool = self.calculate_pool(arcanum)
             pool_label = QLabel(pool)
+            pool_label.setToolTip(odds.describe(int(pool)))
+            pool_label.setCursor(QCursor(Qt.WhatsThisCursor))
             pool_label.setStyleSheet("QLabel {font: 10pt}")
             self.praxes[self.row]['pool'] = pool_label
 
@@ -174,8 +177,9 @@ class Praxes(QWidget):
             arcanum_label.setText(new_arcanum)
 
             pool_label = self.praxes[index]['pool']
-            pool = str(self.character.stats[arcanum] + self.character.stats['gnosis'])
+            pool = self.calculate_pool(arcanum)
             pool_label.setText(pool)
+            pool_label.setToolTip(odds.describe(int(pool)))
 
     def edit_entry(self, index=None):
         if not self.character.edit_mode:
@@ -238,6 +242,8 @@ class Praxes(QWidget):
             # pool
             pool = self.calculate_pool(arcanum)
             pool_label = QLabel(pool)
+            pool_label.setToolTip(odds.describe(int(pool)))
+            pool_label.setCursor(QCursor(Qt.WhatsThisCursor))
             pool_label.setStyleSheet("QLabel {font: 10pt}")
             self.praxes[self.row]['pool'] = pool_label
 
@@ -285,6 +291,7 @@ class Praxes(QWidget):
             # Update pool
             pool = self.calculate_pool(arcanum)
             self.praxes[index]['pool'].setText(pool)
+            self.praxes[index]['pool'].setToolTip(odds.describe(int(pool)))
 
 
 class Praxis_Dialog(QDialog):
@@ -469,13 +476,17 @@ class Ench_Items(QWidget):
 
         if item_type == "imbued":
             # imbued pool = rating + player Gnosis
-            return (str(rating + self.character.stats['gnosis']),
-                    "Item Rating(" + str(rating) + ") + Character Gnosis(" + str(self.character.stats['gnosis']) + ")")
+            pool = rating + self.character.stats['gnosis']
+            return (str(pool),
+                    "Item Rating(" + str(rating) + ") + Character Gnosis(" + str(self.character.stats['gnosis']) + ")"
+                    + "\n\n" + odds.describe(pool))
         else:
             # artifact pool = rating + 0.5*rating (rounded up)
             # players can optionally use their own stats, but will only show the item's stats
-            return (str(math.ceil(rating * 1.5)),
-                    "Item Rating(" + str(rating) + ") + Item Gnosis(" + str(math.ceil(rating / 2)) + ")")
+            pool = math.ceil(rating * 1.5)
+            return (str(pool),
+                    "Item Rating(" + str(rating) + ") + Item Gnosis(" + str(math.ceil(rating / 2)) + ")"
+                    + "\n\n" + odds.describe(pool))
 
     def update_items(self):
         for index in self.items:
@@ -822,6 +833,8 @@ class Rotes(QWidget):
             # pool
             pool = self.calculate_pool(rote)
             pool_label = QLabel(str(pool))
+            pool_label.setToolTip(odds.describe(pool, rote=True))
+            pool_label.setCursor(QCursor(Qt.WhatsThisCursor))
             pool_label.setStyleSheet("QLabel {font: 10pt}")
             self.rotes[self.row].append(pool_label)
 
@@ -881,6 +894,7 @@ class Rotes(QWidget):
             # update pool
             pool = self.calculate_pool(rote)
             current[3].setText(str(pool))
+            current[3].setToolTip(odds.describe(pool, rote=True))
 
     def edit_entry(self, index=None):
         if not self.character.edit_mode:
@@ -956,6 +970,8 @@ class Rotes(QWidget):
             # pool
             pool = self.calculate_pool(rote)
             pool_label = QLabel(str(pool))
+            pool_label.setToolTip(odds.describe(pool, rote=True))
+            pool_label.setCursor(QCursor(Qt.WhatsThisCursor))
             pool_label.setStyleSheet("QLabel {font: 10pt}")
             self.rotes[self.row].append(pool_label)
 
@@ -1019,6 +1035,7 @@ class Rotes(QWidget):
             # update pool
             pool = self.calculate_pool(rote)
             current[3].setText(str(pool))
+            current[3].setToolTip(odds.describe(pool, rote=True))
 
 
 class Rote_Dialog(QDialog):
@@ -2,6 +2,7 @@
 #   Copyright (C) 2017  Roy Healy
 
 import stats
+import spellcasting
 import sip
 import basicUI
 from PyQt5.QtWidgets import *
@@ -23,13 +24,16 @@ ARCANA = ['death',
           'space',
           'time']
 
-PRACTICES = [('practice', 0)]
+# spell factor tables live with the casting engine
+PRACTICES = spellcasting.PRACTICES
 
-DURATION = {0: 'length'}
-ADV_DURATION = {0: 'length'}
+DURATION = spellcasting.DURATION
+ADV_DURATION = spellcasting.ADV_DURATION
 
-SCALE = {0: 'length'}
-ADV_SCALE = {0: 'length'}
+SCALE = spellcasting.SCALE
+ADV_SCALE = spellcasting.ADV_SCALE
+
+YANTRAS = spellcasting.YANTRAS
 
 # Mage sheet headers
 
@@ -570,135 +574,274 @@ def from_xml(cls, dom):
                splat = 'mage')
 
 class CastWindow(QWidget):
-    def __init__(self, character):
+    '''
+    Builds up a spell, showing the casting and paradox pools with their odds, and casts it.
+    '''
+    def __init__(self, character, parent=None, send=None):
+        '''
+        parent: window with a status bar, used for status updates
+        send: function that posts a message, the window only works out pools without one
+        '''
+        super().__init__()
         self.character = character
+        self.parent = parent
+        self.send = send
         self.initUI()
 
     def initUI(self):
         self.grid = QGridLayout()
         self.grid.setSpacing(5)
-        self.grid.setContentsMargins(0, 0, 0, 0)
         self.setLayout(self.grid)
         self.grid.setAlignment(Qt.AlignHCenter | Qt.AlignTop)
 
+        # spell name, used in messages
+        self.name_label = QLabel("Spell:")
+        self.name_entry = QLineEdit()
+        self.name_entry.setPlaceholderText("Spell name")
+
         # select arcana - dropdown
         self.arcanum_label = QLabel("Primary Arcanum:")
         self.arcanum_entry = QComboBox()
         for arcanum in sorted(ARCANA):
-            self.arcanum_entry.addItem(arcanum.title() + ' (' + self.character.stats[arcanum] + ')')
+            self.arcanum_entry.addItem(arcanum.title() + ' (' + str(self.character.stats[arcanum]) + ')', arcanum)
         self.arcanum_entry.currentIndexChanged.connect(self.update_details)
 
         # select practice - dropdown
         self.practice_label = QLabel("Practice:")
         self.practice_entry = QComboBox()
-        for practice in sorted(PRACTICES):
-            self.practice_entry.addItem(practice[0].title() + ' (' + str(practice[1]))
+        for practice in PRACTICES:
+            self.practice_entry.addItem(practice[0].title() + ' (' + str(practice[1]) + ')', practice[0])
         self.practice_entry.currentIndexChanged.connect(self.update_details)
 
+        # select primary factor - dropdown
+        self.primary_label = QLabel("Primary Factor:")
+        self.primary_entry = QComboBox()
+        for factor in ('potency', 'duration', 'scale'):
+            self.primary_entry.addItem(factor.title(), factor)
+        self.primary_entry.currentIndexChanged.connect(self.update_details)
+
         # select potency - spinbox
         self.potency_label = QLabel("Potency:")
         self.potency_entry = QSpinBox()
+        self.potency_entry.setMinimum(1)
         self.potency_entry.setMaximumWidth(30)
         self.potency_entry.valueChanged.connect(self.update_details)
 
         # select duration - check mark to switch to advanced
         self.duration_label = QLabel("Duration:")
         self.duration_entry = QComboBox()
-        for level in sorted(DURATION):
-            self.duration_entry.addItem(DURATION[level].title() + ' (' + str(level) + ')')
-
-        self.duration_entry.currentIndexChanged.connect(self.update_details)
-
         self.duration_sel = QCheckBox()
         self.duration_sel.setText("Advanced Duration")
-        #self.duration_sel.stateChanged.connect(self.duration_change)
+        self.duration_sel.stateChanged.connect(self.duration_change)
+        self.duration_change()
+        self.duration_entry.currentIndexChanged.connect(self.update_details)
 
         # select scale - check mark to switch to advanced
         self.scale_label = QLabel("Scale:")
         self.scale_entry = QComboBox()
-        for level in sorted(SCALE):
-            self.scale_entry.addItem(SCALE[level].title() + ' (' + str(level) + ')')
-
-        self.scale_entry.currentIndexChanged.connect(self.update_details)
-
         self.scale_sel = QCheckBox()
         self.scale_sel.setText("Advanced Scale")
+        self.scale_sel.stateChanged.connect(self.scale_change)
+        self.scale_change()
+        self.scale_entry.currentIndexChanged.connect(self.update_details)
 
-        #self.scale_sel.stateChanged.connect(self.scale_change)
+        self.range_sel = QCheckBox()
+        self.range_sel.setText("Sensory Range")
+        self.range_sel.stateChanged.connect(self.update_details)
 
         # select cast time
-
         self.time_label = QLabel("Ritual Cycles:")
         self.time_entry = QSpinBox()
         self.time_entry.setMinimum(0)
         self.time_entry.setValue(1)
-
+        self.time_entry.setToolTip("0 casts the spell instantly, for a reach")
         self.time_entry.valueChanged.connect(self.update_details)
 
-        # This label depends on time_entry value
-        self.time_summary = QLabel()
-
         # select additional reaches
-        ## new object needed, select value and explanation
+        self.reach_label = QLabel("Other Reaches:")
+        self.reach_entry = QSpinBox()
+        self.reach_entry.valueChanged.connect(self.update_details)
 
         # select additional yantras
-        ## same as previous object
+        self.yantra_label = QLabel("Yantras:")
+        self.yantra_entry = QListWidget()
+        for yantra in sorted(YANTRAS):
+            item = QListWidgetItem(yantra.title() + ' (+' + str(YANTRAS[yantra]) + ')')
+            item.setData(Qt.UserRole, yantra)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.yantra_entry.addItem(item)
+        self.yantra_entry.itemChanged.connect(self.update_details)
+
+        self.rote_sel = QCheckBox()
+        self.rote_sel.setText("Rote")
+        self.rote_sel.stateChanged.connect(self.update_details)
+
+        self.praxis_sel = QCheckBox()
+        self.praxis_sel.setText("Praxis")
+        self.praxis_sel.stateChanged.connect(self.update_details)
 
         # select paradox modifiers
-        ## same as previous object
+        self.witness_sel = QCheckBox()
+        self.witness_sel.setText("Sleeper Witnesses")
+        self.witness_sel.stateChanged.connect(self.update_details)
+
+        self.tool_sel = QCheckBox()
+        self.tool_sel.setText("Dedicated Tool")
+        self.tool_sel.stateChanged.connect(self.update_details)
+
+        self.paradox_rolls_label = QLabel("Paradox Rolls This Scene:")
+        self.paradox_rolls_entry = QSpinBox()
+        self.paradox_rolls_entry.valueChanged.connect(self.update_details)
+
+        self.mana_label = QLabel("Mana Against Paradox:")
+        self.mana_entry = QSpinBox()
+        self.mana_entry.valueChanged.connect(self.update_details)
 
         # display of cast and paradox pool
         self.pools = QLabel()
 
         # button to state spell info
         self.state_spell_button = QPushButton("State Spell Details")
+        self.state_spell_button.setStyleSheet("QPushButton:pressed { background-color: white }")
         self.state_spell_button.clicked.connect(self.state_spell_summary)
 
         # button to roll spell
-        self.state_spell_button = QPushButton("State Spell Details")
-        self.state_spell_button.clicked.connect(self.roll)
+        self.roll_button = QPushButton("Cast Spell")
+        self.roll_button.setStyleSheet("QPushButton:pressed { background-color: white }")
+        self.roll_button.clicked.connect(self.roll)
+
+        rows = [(self.name_label, self.name_entry),
+                (self.arcanum_label, self.arcanum_entry),
+                (self.practice_label, self.practice_entry),
+                (self.primary_label, self.primary_entry),
+                (self.potency_label, self.potency_entry),
+                (self.duration_label, self.duration_entry, self.duration_sel),
+                (self.scale_label, self.scale_entry, self.scale_sel),
+                (self.time_label, self.time_entry, self.range_sel),
+                (self.reach_label, self.reach_entry),
+                (self.yantra_label, self.yantra_entry),
+                (self.rote_sel, self.praxis_sel),
+                (self.witness_sel, self.tool_sel),
+                (self.paradox_rolls_label, self.paradox_rolls_entry),
+                (self.mana_label, self.mana_entry)]
+        for row, widgets in enumerate(rows):
+            for col, widget in enumerate(widgets):
+                self.grid.addWidget(widget, row, col)
+
+        row = len(rows)
+        self.grid.addWidget(self.pools, row, 0, 1, 3)
+        self.grid.addWidget(self.state_spell_button, row + 1, 1)
+        self.grid.addWidget(self.roll_button, row + 1, 2)
 
         self.update_details()
 
-    def update_details(self):
+    def duration_change(self):
         '''
-        Check widgets, calculate details, update UI
-        :return: 
+        Swaps the duration choices between standard and advanced.
         '''
-        arcanum = int(self.arcanum_entry.currentText()[-2:-1])
-        self.cast_pool = self.character['stats']['gnosis'] + arcanum
+        self.fill_factor(self.duration_entry, ADV_DURATION if self.duration_sel.isChecked() else DURATION)
 
-        # add yantra
-
-        # add extended cast time
-        # 0 = instant = +1 reach, ritual adds time based on Gnosis
-        ## if statement defining cast time, updates pool and time summary label
-
-        # remove potency
+    def scale_change(self):
+        '''
+        Swaps the scale choices between standard and advanced.
+        '''
+        self.fill_factor(self.scale_entry, ADV_SCALE if self.scale_sel.isChecked() else SCALE)
+
+    def fill_factor(self, entry, table):
+        entry.blockSignals(True)
+        entry.clear()
+        for level in sorted(table):
+            entry.addItem(table[level].title() + ' (-' + str(level * spellcasting.FACTOR_PENALTY) + ')', level)
+        entry.blockSignals(False)
+        self.update_details()
 
-        # remove duration
+    def get_spell(self):
+        '''
+        Spell choices from the widgets, in the form spellcasting.calculate uses.
+        '''
+        yantras = []
+        for index in range(self.yantra_entry.count()):
+            item = self.yantra_entry.item(index)
+            if item.checkState() == Qt.Checked:
+                yantras.append(item.data(Qt.UserRole))
+
+        return {'arcanum': self.arcanum_entry.currentData(),
+                'practice': self.practice_entry.currentData(),
+                'primary factor': self.primary_entry.currentData(),
+                'potency': self.potency_entry.value(),
+                'duration': self.duration_entry.currentData(),
+                'advanced duration': self.duration_sel.isChecked(),
+                'scale': self.scale_entry.currentData(),
+                'advanced scale': self.scale_sel.isChecked(),
+                'advanced range': self.range_sel.isChecked(),
+                'ritual intervals': self.time_entry.value(),
+                'extra reaches': self.reach_entry.value(),
+                'yantras': yantras,
+                'rote': self.rote_sel.isChecked(),
+                'praxis': self.praxis_sel.isChecked(),
+                'witnesses': self.witness_sel.isChecked(),
+                'paradox rolls': self.paradox_rolls_entry.value(),
+                'dedicated tool': self.tool_sel.isChecked(),
+                'paradox mana': self.mana_entry.value()}
 
-        # remove scaling
+    def update_details(self):
+        '''
+        Check widgets, calculate details, update UI
+        '''
+        # widgets still being built
+        if not hasattr(self, 'pools'):
+            return
 
-        self.paradox_pool = 'None'
+        try:
+            self.calculated = spellcasting.calculate(self.character.stats, self.get_spell())
+        except ValueError as error:
+            self.calculated = None
+            self.pools.setText(str(error))
+            self.roll_button.setEnabled(False)
+            return
 
-        # calculate free reaches
+        self.pools.setText("\n".join(spellcasting.describe(self.calculated)))
+        self.roll_button.setEnabled(True)
 
-        # update paradox pool if free reaches surpassed
-        # check if dedicated tool used and reduce paradox if so
+    def spell_name(self):
+        return self.name_entry.text().strip() or "a spell"
 
-        if self.cast_pool <= 0:
-            self.cast_pool = 'Chance'
+    def ready(self):
+        '''
+        Checks a spell can be posted, updating the status bar if not.
+        '''
+        if self.calculated is None or self.send is None:
+            return False
 
-        if self.paradox_pool.isdigit() and self.paradox_pool <= 0:
-            self.paradox_pool = 'Chance'
+        if self.character.stats['webhook'] == "" or self.character.stats['user id'] == "":
+            if self.parent:
+                self.parent.status_update("User Details Missing.")
+            return False
 
-        self.pools.setText("Cast Pool: " + str(self.cast_pool) + "   Paradox Pool: " + str(self.paradox_pool))
+        return True
 
     def state_spell_summary(self):
-        pass
+        '''
+        Posts the spell's pools and odds without casting it.
+        '''
+        if not self.ready():
+            return
+
+        self.send(self.character.stats['user id'] + " is casting " + self.spell_name() + ":\n"
+                  + "\n".join(spellcasting.describe(self.calculated)))
 
     def roll(self):
-        pass
+        '''
+        Casts the spell, rolling any paradox at the same time, and posts the outcome as one message.
+        '''
+        if not self.ready():
+            return
+
+        result, paradox = self.character.cast_spell(self.calculated)
+
+        self.send(spellcasting.summary(self.character.stats['user id'], self.spell_name(), self.calculated,
+                                       result, paradox))
 
-        
+        if self.parent:
+            self.parent.status_update("Cast " + self.spell_name() + ": " + str(result.successes) + " successes")
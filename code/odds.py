@@ -0,0 +1,199 @@
+# Chronicles of Darkness roll probabilities created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+from functools import lru_cache
+
+# chance of a single face landing on a failure (1-7)
+FAIL = 0.7
+
+# a chance die only succeeds on a 10 and dramatically fails on a 1
+CHANCE_SUCCESS = 0.1
+CHANCE_BOTCH = 0.1
+
+
+def default_limit(dice):
+    '''
+    Number of successes tracked before the rest of the tail is grouped together.
+    Explosions mean a pool can get more successes than it has dice.
+    '''
+    return 2 * dice + 10
+
+
+def die_distribution(again=10, rote=False, limit=10):
+    '''
+    Chance of each number of successes from a single die, including its explosions and rote reroll.
+    Returns a list where entry i is the chance of exactly i successes, apart from the final entry
+    which is the chance of limit or more.
+    '''
+
+    # a face explodes if it is at least again, otherwise 8+ is one success
+    explode = (11 - again) / 10
+    success = 1 - FAIL - explode
+
+    # chain of explosions: 0 on a fail, 1 on a plain success, 1 + another chain on an explosion
+    chain = [0.0] * (limit + 1)
+    chain[0] = FAIL
+    if limit:
+        chain[1] = success + explode * FAIL
+        for count in range(2, limit + 1):
+            chain[count] = explode * chain[count - 1]
+    # whatever is left belongs in the final bucket
+    chain[limit] = 1 - sum(chain[:limit])
+
+    if not rote:
+        return chain
+
+    # a rote die rerolls the chain once if its first face failed
+    out = [FAIL * value for value in chain]
+    for count in range(1, limit + 1):
+        out[count] += chain[count]
+    return out
+
+
+def convolve(first, second, limit):
+    '''
+    Combines the success distributions of two independent sets of dice.
+    Anything at or past limit is added to the final bucket.
+    '''
+    out = [0.0] * (limit + 1)
+    for i, p in enumerate(first):
+        if not p:
+            continue
+        for j, q in enumerate(second):
+            out[min(i + j, limit)] += p * q
+    return out
+
+
+@lru_cache(maxsize=512)
+def distribution(dice, again=10, rote=False, limit=None):
+    '''
+    Exact chance of each number of successes for a dice pool, following the same rules as Character.roll_set.
+    dice: int, the number of dice in the pool
+    again: int, which die faces explode
+    rote: boolean, a rote roll rerolls all failed dice once
+    limit: int, successes past this are grouped in the final entry, defaults to default_limit(dice)
+    Returns a tuple where entry i is the chance of exactly i successes, apart from the final entry
+    which is the chance of limit or more successes.
+    '''
+    if limit is None:
+        limit = default_limit(dice)
+
+    if dice <= 0:
+        return (1.0,) + (0.0,) * limit
+
+    if dice == 1:
+        return tuple(die_distribution(again, rote, limit))
+
+    # split the pool in half so each size is only worked out once and stays in the cache
+    half = dice // 2
+    out = convolve(distribution(half, again, rote, limit), distribution(dice - half, again, rote, limit), limit)
+    return tuple(out)
+
+
+def at_least(dice, successes, again=10, rote=False):
+    '''
+    Chance of getting at least a number of successes.
+    '''
+    if successes <= 0:
+        return 1.0
+    if successes > default_limit(dice):
+        # track far enough into the tail to count the requested successes exactly
+        return sum(distribution(dice, again, rote, successes)[successes:])
+    return sum(distribution(dice, again, rote)[successes:])
+
+
+def expected_successes(dice, again=10, rote=False):
+    '''
+    Average number of successes for a dice pool.
+    '''
+    if dice <= 0:
+        return 0.0
+
+    # each die: 0.3 chance of success, plus another die for each explosion
+    explode = (11 - again) / 10
+    per_die = (1 - FAIL) / (1 - explode)
+    if rote:
+        per_die += FAIL * per_die
+    return dice * per_die
+
+
+# largest pool covered by the precomputed odds table
+TABLE_POOLS = 40
+
+
+@lru_cache(maxsize=None)
+def odds_table(again=10, rote=False):
+    '''
+    Expected successes, chance of at least 1 success and chance of an exceptional success (5+)
+    for every pool from 0 to TABLE_POOLS. Built once per again/rote mode, the first time it is needed.
+    A pool of 0 is rolled as a chance die.
+    '''
+    table = [(CHANCE_SUCCESS, CHANCE_SUCCESS, 0.0)]
+    for pool in range(1, TABLE_POOLS + 1):
+        # only 0-4 successes need to be told apart, so every pool shares the same small limit
+        counts = distribution(pool, again, rote, 5)
+        table.append((expected_successes(pool, again, rote), 1 - counts[0], counts[5]))
+    return tuple(table)
+
+
+def odds_summary(pool, again=10, rote=False):
+    '''
+    Returns (expected successes, chance of 1+, chance of 5+) for a pool.
+    '''
+    pool = max(pool, 0)
+    if pool <= TABLE_POOLS:
+        return odds_table(again, rote)[pool]
+    return expected_successes(pool, again, rote), at_least(pool, 1, again, rote), at_least(pool, 5, again, rote)
+
+
+def describe(pool, again=10, rote=False):
+    '''
+    Short text stating the odds of a pool, used for tooltips.
+    '''
+    expected, success, exceptional = odds_summary(pool, again, rote)
+    if pool <= 0:
+        out = "Chance die\n"
+    else:
+        out = ""
+    out += "Average: " + format(expected, '.1f') + " successes\n"
+    out += "1+ successes: " + format(success, '.0%') + "\n"
+    out += "5+ successes: " + format(exceptional, '.0%')
+    return out
+
+
+def extended_distribution(dice, target, limit, again=10, rote=False):
+    '''
+    Chance of reaching the target of an extended action on each roll.
+    dice: int, the pool rolled each time, less than 1 rolls a chance die
+    target: int, successes needed
+    limit: int, the most rolls allowed
+    Returns a list where entry k is the chance the target is first reached on roll k, entry 0 is always 0.
+    Whatever is left over is the chance of not reaching the target within the limit.
+    '''
+    if dice < 1:
+        per_roll = [1 - CHANCE_SUCCESS, CHANCE_SUCCESS]
+    else:
+        # successes at or past the target don't need to be told apart
+        per_roll = distribution(dice, again, rote, target)
+
+    out = [0.0] * (limit + 1)
+    if target <= 0:
+        if limit:
+            out[1] = 1.0
+        return out
+
+    # chance of each running total that has not reached the target yet
+    running = [1.0] + [0.0] * (target - 1)
+    for roll in range(1, limit + 1):
+        following = [0.0] * target
+        for total, p in enumerate(running):
+            if not p:
+                continue
+            for gained, q in enumerate(per_roll):
+                if total + gained >= target:
+                    out[roll] += p * q
+                else:
+                    following[total + gained] += p * q
+        running = following
+
+    return out
@@ -2,11 +2,49 @@
 #    Copyright (C) 2017  Roy Healy
 
 import random
-import mageUI, vampireUI, stats
+import stats, rng, rolllog, history, rollstats, expression, extended, spellcasting, dice as engine
 from xml.dom import minidom
 from xml.etree.ElementTree import Element
 from xml.etree import ElementTree as etree
 
+# the splat sheets need PyQt, without it a Character can still be made from its own stats and messages,
+# which is all bench.py needs
+try:
+    import mageUI, vampireUI
+except ImportError:
+    mageUI = vampireUI = None
+
+
+def change_health(health, amount, dam_type):
+    '''
+    Adds amount of damage to a health track, [max health, bashing, lethal, aggravated].
+    Shared by characters and the stat blocks used for NPCs, see combat.apply_damage.
+    '''
+    # Note this needs extra work to take into account whether the user already has a higher level of damage.
+    # e.g. if I am at 2 lethal and I get a bashing, bashing goes in box number 3.
+    # Right now the code only handles overflow when max health reached.
+    # Might just do all this via UI depending on UAT
+    
+    if dam_type <= 0 or dam_type > 3:
+        # check if input makes sense
+        return "Invalid input."
+
+    # add appropiate damage
+    health[dam_type] += amount
+
+    # check for overflow
+    if health[dam_type] > health[0]:
+        # if new damage is more than max, get difference
+        over = health[dam_type] - health[0]
+        # set current type to equal max
+        health[dam_type] = health[0]
+        if dam_type != 3:
+            # if this is lethal or bashing, damage will upgrade to next type
+            change_health(health, over, dam_type + 1)
+            
+    # output will be a list of strings simialr to last roll which should state the current rating and overflows maybe?
+
+
 class Character:
     def __init__(self,
                  stats=None,
@@ -22,7 +60,22 @@ class Character:
         '''
         
         # results of last roll, starts blank
-        self.last_roll = []
+        self.last_result = None
+
+        # recent rolls, oldest are dropped once it is full
+        self.history = history.RollHistory()
+
+        # running statistics of every roll, saved with the character
+        self.roll_stats = rollstats.RollStats()
+
+        # compiled dice expressions, see roll_expression
+        self.plans = expression.PlanCache()
+
+        # source of die faces, can be swapped for a rng.SecureRNG
+        self.rng = rng.DEFAULT
+
+        # rolls are only written to a log once start_roll_log is called
+        self.roll_log = None
 
         self.splat = splat
 
@@ -57,6 +110,9 @@ class Character:
         self.goodRate = goodrate
         self.badRate = badrate
 
+        # personality messages with the user id filled in, built on first use by compile_messages
+        self.compiled_messages = None
+
         # some stats are derived, this function will calulate them based on the supplied stats sheet
         self.update_derivitives()
         
@@ -100,29 +156,7 @@ class Character:
         '''
         Updates current health by amount of damage.
         '''
-        # Note this needs extra work to take into account whether the user already has a higher level of damage.
-        # e.g. if I am at 2 lethal and I get a bashing, bashing goes in box number 3.
-        # Right now the code only handles overflow when max health reached.
-        # Might just do all this via UI depending on UAT
-        
-        if dam_type <= 0 or dam_type > 3:
-            # check if input makes sense
-            return "Invalid input."
-
-        # add appropiate damage
-        self.stats['health'][dam_type] += amount
-
-        # check for overflow
-        if self.stats['health'][dam_type] > self.stats['health'][0]:
-            # if new damage is more than max, get difference
-            over = self.stats['health'][dam_type] - self.stats['health'][0]
-            # set current type to equal max
-            self.stats['health'][dam_type] = self.stats['health'][0]
-            if dam_type != 3:
-                # if this is lethal or bashing, damage will upgrade to next type
-                self.change_health(over, dam_type + 1)
-                
-        # output will be a list of strings simialr to last roll which should state the current rating and overflows maybe?
+        return change_health(self.stats['health'], amount, dam_type)
 
     def save_xml(self, path):
         '''
@@ -269,6 +303,9 @@ class Character:
         root.append(item)
         item.text = str(self.goodRate)
 
+        # Roll statistics
+        root.append(self.roll_stats.to_element())
+
         # write file
         rough_string = etree.tostring(root, 'utf-8')
         reparsed = minidom.parseString(rough_string)
@@ -298,6 +335,7 @@ class Character:
         dicts = dom.findall('dict')
         health = dom.find('health')
         others = dom.findall('other')
+        saved_stats = dom.find('rollstats')
 
         ### backwards compatibility
         if not dicts:
@@ -376,6 +414,9 @@ class Character:
 
         char.badRate = int(badRate.text)
 
+        if saved_stats != None:
+            char.roll_stats = rollstats.RollStats.from_element(saved_stats)
+
         return char
 
 
@@ -394,31 +435,10 @@ class Character:
         if dice < 1:
             return ['Select at least 1 die.']
 
-        # self.last_roll field collects the value of each rolled die
-        # initialised to blank here, will be set in each self.roll_die call
-        self.last_roll = []
-        
-        # successes collector variable 
-        successes = 0
-        
-        # fail collector in case it is a rote
-        fails = []
-
-        
-        for die in range(0,dice):
-            # roll each die
-            result = self.roll_die(again)
-            if result == 0:
-                # if not a success adds entry to fail list for rote reroll
-                fails += ["fail"]
-            else:
-                # add the result to successes counter
-                successes += result
-
-        if rote:
-            # if a rote all failed dice are rerolled once
-            for die in fails:
-                successes += self.roll_die(again, rote_reroll = True)
+        # all dice and explosions are rolled in batches by the dice engine
+        offset = self.rng.position
+        self.record(engine.roll_pool(dice, again, rote, self.rng), offset)
+        successes = self.last_result.successes
 
         # send message
         messages = []
@@ -428,82 +448,153 @@ class Character:
             messages.extend(self.last_roll)
 
         else:
-            # add a summary message
-            out = self.stats['user id'] + " rolled " + str(dice) + " dice and got " + str(successes) + " successes."
-            for message in self.last_roll:
-                # find dice value
-                value = ''.join(x for x in message[len(self.stats['user id']) + 1:] if x.isdigit())
-                if "exploded" in message:
-                    out += "(" + value + ")"
-                elif "rote" in message:
-                    out += " Rote:" + value
-                else:
-                    out += " " + value
-
-            messages.append(out)
-                
+            # add a summary message, built straight from the roll's faces and flags
+            messages.append(self.last_result.summary(self.stats['user id']))
 
         # add total results message
         messages.append("Total Successes for " + self.stats['user id'] + " : " + str(successes))
         
         return messages
             
-    def roll_die(self, again = 10, explode_reroll = False, rote_reroll = False):
+    def record(self, result, offset=None, source=None):
         '''
-        Rolls a single 10 sided die, calculates number of successes.
-        Also updates the self.last_roll attribute with each roll result.
-        Handles explosions and gives custom last_roll text for rote/explosions
+        Keeps a roll in the character's history and statistics, makes it the last roll and writes it to the roll log.
+        offset: position of source before the roll was drawn, rolls without one can't be replayed so aren't logged
+        source: where the roll was drawn from, defaults to the character's own rng
         '''
+        self.history.add(result)
+        self.roll_stats.add(result)
+        self.last_result = result
+        self.log(result, offset, source)
+
+    def log(self, result, offset=None, source=None):
+        '''
+        Writes a roll to the roll log only, if one is being kept, see record.
+        '''
+        source = source or self.rng
+        if self.roll_log and offset is not None and source.seed is not None:
+            self.roll_log.append(result, source, offset)
+
+    def cast_spell(self, calculated):
+        '''
+        Casts a spell worked out by spellcasting.calculate, rolling any paradox at the same time.
+        Only the casting roll is kept in the character's history and statistics, the paradox roll isn't the
+        player's own so it only goes in the roll log.
+        Returns (casting RollResult, paradox RollResult or None).
+        '''
+        # batched, unless rolls are being logged, then each is drawn on its own so it can be replayed
+        rolled = engine.roll_logged(spellcasting.pools(calculated), self.rng, self.roll_log is not None)
+
+        result, offset = rolled[0]
+        self.record(result, offset)
+        if len(rolled) == 1:
+            return result, None
+
+        paradox, offset = rolled[1]
+        self.log(paradox, offset)
+        return result, paradox
+
+    def roll_extended(self, dice, target, limit, rote=False, again=10):
+        '''
+        Rolls an extended action: the same pool up to limit times until target successes are reached.
+        All rolls are made at once and reported together.
+        Returns a list of two strings, a summary of the whole action and then the total successes.
+        '''
+        if limit < 1:
+            return ['Roll limit must be at least 1.']
+
+        rolled = extended.roll_extended(dice, target, limit, again, rote, self.rng, self.roll_log is not None)
+        for result, offset in rolled:
+            self.record(result, offset)
+        results = [result for result, offset in rolled]
+
+        total = sum(result.successes for result in results)
+        return [extended.summary(self.stats['user id'], dice, target, limit, results, again, rote),
+                "Total Successes for " + self.stats['user id'] + " : " + str(total)]
+
+    def roll_expression(self, text, quiet=False):
+        '''
+        Rolls a dice expression such as "dex+firearms+2 9again rote".
+        The compiled plan is cached, so repeating a roll only adds up the stats again if they changed.
+        Raises ValueError if the expression can't be read.
+        Returns the same messages as roll_set, or roll_chance if the pool is below 1.
+        '''
+        return self.plans.get(text, self.stats).roll(self, quiet)
+
+    def set_messages(self, goodMessages, badMessages):
+        '''
+        Replaces the personality messages and rebuilds their compiled copies.
+        '''
+        self.goodMessages = goodMessages
+        self.badMessages = badMessages
+        self.compile_messages()
+
+    def compile_messages(self):
+        '''
+        Substitutes the user id into every personality message once, rather than on every roll.
+        '''
+        user = self.stats['user id']
+        self.compiled_messages = (user,
+                                  [message.replace("[userID]", user) for message in self.goodMessages],
+                                  [message.replace("[userID]", user) for message in self.badMessages])
+
+    def get_messages(self, messagetype):
+        '''
+        Returns the compiled "good" or "bad" personality messages.
+        They are only rebuilt if the user id has changed since they were compiled.
+        '''
+        if self.compiled_messages is None or self.compiled_messages[0] != self.stats['user id']:
+            self.compile_messages()
+
+        if messagetype == 'good':
+            return self.compiled_messages[1]
+        return self.compiled_messages[2]
+
+    def personality_message(self, successes):
+        '''
+        Takes the successes from a roll, determines if a positive/negative message should be sent.
+        Very bad rolls get a "bad" message and very good ones a "good" message, at the character's rates.
+        :param successes: int
+        :return: list of messages to send, empty if none
+        '''
+        messagetype = None
+        if successes == 0 and random.randrange(1,100) <= self.badRate:
+            messagetype = "bad"
+        elif successes >= 5 and random.randrange(1,100) <= self.goodRate:
+            messagetype = "good"
+
+        if messagetype is None:
+            return []
+
+        # messages already have the user id filled in
+        messages = self.get_messages(messagetype)
+        if not messages:
+            return []
+        return [random.choice(messages)]
 
-        # make roll by choosing random number between 1 and 10
-        value = random.randrange(1, 11)
-    
-        # recording value, adds details for rote/reroll
-        if explode_reroll and rote_reroll:
-            self.last_roll.append(self.stats['user id'] + " rolled rote exploded die: " + str(value))
-        elif explode_reroll:
-            self.last_roll.append(self.stats['user id'] + " rolled exploded die: " + str(value))
-        elif rote_reroll:
-            self.last_roll.append(self.stats['user id'] + " rolled rote die: " + str(value))
-        else:
-            self.last_roll.append(self.stats['user id'] + " rolled " + str(value))
-
-        # checks for success/explosions
-        if value >= again:
-            # Exploding!
-            return 1 + self.roll_die(again, True, rote_reroll)
-        elif value >= 8:
-            # normal success
-            return 1
-        else:
-            # failure
-            return 0
-    
     def roll_special(self):
         '''
         Rolls a single die, successes are not counted and last_roll not updated
         '''
-        value = random.randrange(1, 11)
+        value = self.rng.face()
         return self.stats['user id'] + " rolled a " + str(value) + "!"
 
     def roll_chance(self):
         '''
         Rolls a chance die.
         '''
-        # make roll by choosing random number between 1 and 10
-        value = random.randrange(1, 11)
-
-        # clear last roll and append chance die result
-        self.last_roll = []
-        self.last_roll.append(self.stats['user id'] + " rolled a chance die: " + str(value))
+        # chance die replaces the last roll
+        offset = self.rng.position
+        self.record(engine.roll_chance(self.rng), offset)
+        value = self.last_result.faces[0]
 
         # Give value
         messages = [self.stats['user id'] + " chance rolled " + str(value)]
 
         # # check if failure, botch or success
-        if value == 10:
+        if self.last_result.successes:
             messages.append(self.stats['user id'] + " got a success!")
-        elif value == 1:
+        elif self.last_result.botched:
             messages.append(self.stats['user id'] + " botched!")
         else:
             messages.append(self.stats['user id'] + " failed!")
@@ -511,6 +602,34 @@ class Character:
         # Give result
         return messages
 
+    def start_roll_log(self, path, seed=None):
+        '''
+        Gives the character its own seeded stream of faces and writes every roll to a log file,
+        so any roll can be replayed and checked later with rolllog.verify.
+        path: str, log file to append to
+        seed: optional int seed, a random one is picked if not given
+        '''
+        if seed is None:
+            seed = rolllog.new_seed()
+        self.rng = rng.BufferedRNG(seed)
+        self.roll_log = rolllog.RollLog(path)
+
+    def stop_roll_log(self):
+        '''
+        Stops logging and goes back to the shared source of faces.
+        '''
+        self.rng = rng.DEFAULT
+        self.roll_log = None
+
+    @property
+    def last_roll(self):
+        '''
+        Messages for each die of the last roll, only rendered when needed.
+        '''
+        if self.last_result is None:
+            return []
+        return self.last_result.lines(self.stats['user id'])
+
     def get_last_roll(self):
         # used for getting results of last roll made
         return self.last_roll
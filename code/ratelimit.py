@@ -0,0 +1,152 @@
+# Webhook rate limiting created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+# seconds a bucket is assumed to take to refill when Discord doesn't say
+RESET = 2
+
+
+def key(webhook):
+    '''
+    Buckets are kept per webhook path, so a full URL and a path on the host share one.
+    '''
+    return urlsplit(webhook).path or webhook
+
+
+def header(headers, name):
+    '''
+    Reads a number from the response headers, None if it is missing or not a number.
+    headers: anything with a get method, header names are looked up in lower case
+    '''
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class Bucket:
+    '''
+    What is known about one webhook's rate limit.
+    '''
+
+    def __init__(self):
+        # messages allowed each window, None until Discord tells us
+        self.limit = None
+        # places left in the window from opens to reset_at, None means no limit is known
+        # it goes below 0 when messages are waiting for later windows
+        self.remaining = None
+        # time.monotonic() when the window messages are being given places in opens, later than now if it is full
+        self.opens = 0.0
+        # time.monotonic() when the bucket refills
+        self.reset_at = 0.0
+        # seconds the bucket takes to refill
+        self.window = RESET
+        # messages sent that haven't had a response yet
+        self.pending = 0
+
+
+class RateLimiter:
+    '''
+    Tracks the rate limit of every webhook from the X-RateLimit headers Discord sends back.
+    Before each message reserve() says how long to wait: nothing while the bucket has room, otherwise
+    exactly until it refills. Every sender shares one limiter, so characters posting to the same webhook
+    take turns from the same bucket rather than running into 429s.
+    '''
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, webhook):
+        name = key(webhook)
+        if name not in self.buckets:
+            self.buckets[name] = Bucket()
+        return self.buckets[name]
+
+    def reserve(self, webhook):
+        '''
+        Takes a place in the webhook's bucket.
+        Returns the seconds to wait before sending, 0 if it can go now.
+        Every reserve must be followed by update or release.
+        '''
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.bucket(webhook)
+            bucket.pending += 1
+            if bucket.remaining is None:
+                return 0
+
+            if now >= bucket.reset_at:
+                # the bucket has refilled since we last heard
+                bucket.remaining = bucket.limit or 1
+                bucket.opens = now
+                bucket.reset_at = now + bucket.window
+
+            while bucket.remaining <= 0:
+                # no room left, this message goes in the next window, when the bucket refills
+                bucket.remaining += bucket.limit or 1
+                bucket.opens = bucket.reset_at
+                bucket.reset_at += bucket.window
+            bucket.remaining -= 1
+
+            # every message given a place in a later window waits until it opens
+            return max(0, bucket.opens - now)
+
+    def update(self, webhook, headers):
+        '''
+        Reads the bucket from a response's headers.
+        Messages still waiting on a response are taken off what Discord says is left.
+        '''
+        remaining = header(headers, 'x-ratelimit-remaining')
+        limit = header(headers, 'x-ratelimit-limit')
+        reset_after = header(headers, 'x-ratelimit-reset-after')
+        if reset_after is None:
+            reset = header(headers, 'x-ratelimit-reset')
+            if reset is not None:
+                reset_after = max(reset - time.time(), 0)
+
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.bucket(webhook)
+            bucket.pending = max(bucket.pending - 1, 0)
+            if remaining is None:
+                return
+
+            if limit is not None:
+                bucket.limit = int(limit)
+            if reset_after is not None:
+                bucket.reset_at = now + reset_after
+                bucket.window = max(bucket.window, reset_after)
+            elif bucket.reset_at < now:
+                bucket.reset_at = now + bucket.window
+            # the headers describe the window open now, messages waiting for later ones count against it first
+            bucket.opens = now
+            bucket.remaining = int(remaining) - bucket.pending
+
+    def release(self, webhook):
+        '''
+        Gives back a place when a message got no response.
+        '''
+        with self.lock:
+            bucket = self.bucket(webhook)
+            bucket.pending = max(bucket.pending - 1, 0)
+
+    def limited(self, webhook, wait):
+        '''
+        Empties the bucket for wait seconds after Discord says we are rate limited anyway.
+        '''
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.bucket(webhook)
+            bucket.remaining = 0
+            bucket.reset_at = max(bucket.reset_at, now + wait)
+
+
+# shared by every character and every sender
+LIMITER = RateLimiter()
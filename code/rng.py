@@ -0,0 +1,118 @@
+# Random number sources for the dice roller, created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import os
+import random
+from array import array
+
+# bytes 250-255 are thrown away so every face is equally likely
+ACCEPT = 250
+
+# maps an accepted byte straight onto a d10 face
+FACE_TABLE = bytes(value % 10 + 1 for value in range(256))
+REJECT = bytes(range(ACCEPT, 256))
+
+
+class BufferedRNG:
+    '''
+    Hands out d10 faces from a buffer that is refilled in blocks.
+    Random bytes are drawn for a whole block at once and turned into faces with rejection sampling,
+    so the cost of drawing is shared across many rolls.
+    '''
+
+    # checks every refilled block when set, see audit.py
+    auditor = None
+
+    def __init__(self, seed=None, block=1024):
+        '''
+        seed: optional seed to make the stream of faces repeatable
+        block: int, how many bytes are drawn each time the buffer runs out
+        '''
+        self.seed = seed
+        self.block = block
+        self.source = random.Random(seed)
+        self.buffer = b''
+        self.index = 0
+
+        # total faces handed out so far
+        self.position = 0
+
+    def __deepcopy__(self, memo):
+        '''
+        Copies of a character share its dice rather than cloning them, otherwise a copy kept from before a
+        roll would roll the same faces again.
+        '''
+        return self
+
+    def random_bytes(self, count):
+        '''
+        Draws raw random bytes from the underlying source.
+        '''
+        return self.source.getrandbits(count * 8).to_bytes(count, 'little')
+
+    def refill(self):
+        '''
+        Replaces the buffer with a new block of faces.
+        '''
+        faces = b''
+        while not faces:
+            faces = self.random_bytes(self.block).translate(FACE_TABLE, REJECT)
+        if self.auditor is not None:
+            self.auditor.feed(faces)
+        self.buffer = faces
+        self.index = 0
+
+    def faces(self, count):
+        '''
+        Returns an array of count faces.
+        '''
+        out = array('B')
+        while count:
+            if self.index >= len(self.buffer):
+                self.refill()
+            end = min(self.index + count, len(self.buffer))
+            out.frombytes(self.buffer[self.index:end])
+            count -= end - self.index
+            self.position += end - self.index
+            self.index = end
+        return out
+
+    def skip(self, count):
+        '''
+        Throws away count faces, used to move a replayed stream to a known position.
+        '''
+        while count:
+            if self.index >= len(self.buffer):
+                self.refill()
+            step = min(count, len(self.buffer) - self.index)
+            count -= step
+            self.index += step
+            self.position += step
+
+    def face(self):
+        '''
+        Returns a single face.
+        '''
+        if self.index >= len(self.buffer):
+            self.refill()
+        value = self.buffer[self.index]
+        self.index += 1
+        self.position += 1
+        return value
+
+
+class SecureRNG(BufferedRNG):
+    '''
+    Buffered faces drawn from the operating system's cryptographic source.
+    These cannot be seeded or replayed.
+    '''
+
+    def __init__(self, block=1024):
+        super().__init__(block=block)
+
+    def random_bytes(self, count):
+        return os.urandom(count)
+
+
+# shared by every character unless it is given its own source
+DEFAULT = BufferedRNG()
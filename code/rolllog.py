@@ -0,0 +1,165 @@
+# Append-only binary roll log created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import argparse
+import os
+import struct
+import time
+from array import array
+import dice as engine
+from rng import BufferedRNG
+
+# every log file starts with this, followed by the format version
+MAGIC = b'DCRL'
+VERSION = 1
+
+# kind, time, seed, seed offset, rng block size, dice, again, rote, successes, number of faces
+RECORD = struct.Struct('<BdQQHHBBHH')
+
+KINDS = {'set': 0, 'chance': 1}
+KIND_NAMES = {value: key for key, value in KINDS.items()}
+
+
+def new_seed():
+    '''
+    Picks a fresh 64 bit seed for a roll stream.
+    '''
+    return int.from_bytes(os.urandom(8), 'little')
+
+
+class LogEntry:
+    '''
+    One roll read back from a log file.
+    '''
+
+    __slots__ = ('kind', 'time', 'seed', 'offset', 'block', 'dice', 'again', 'rote', 'successes', 'faces', 'flags')
+
+    def __init__(self, kind, time, seed, offset, block, dice, again, rote, successes, faces, flags):
+        self.kind = kind
+        self.time = time
+        self.seed = seed
+        self.offset = offset
+        self.block = block
+        self.dice = dice
+        self.again = again
+        self.rote = rote
+        self.successes = successes
+        self.faces = faces
+        self.flags = flags
+
+
+class RollLog:
+    '''
+    Writes every roll to an append-only binary file so it can be replayed later.
+    The file is only opened while a record is written, so the log can be copied along with its character.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'ab') as f:
+                f.write(MAGIC + bytes([VERSION]))
+
+    def append(self, result, source, offset):
+        '''
+        Records a roll.
+        result: the RollResult to record
+        source: the seeded BufferedRNG the roll was drawn from
+        offset: position of source before the roll was made
+        '''
+        header = RECORD.pack(KINDS[result.kind], time.time(), source.seed, offset, source.block,
+                             result.dice, result.again, result.rote, result.successes, len(result.faces))
+        with open(self.path, 'ab') as f:
+            f.write(header + result.faces.tobytes() + result.flags.tobytes())
+
+
+def read(path):
+    '''
+    Yields each LogEntry in a log file, oldest first.
+    '''
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC) + 1) != MAGIC + bytes([VERSION]):
+            raise ValueError(path + " is not a Dicecord roll log.")
+
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                # end of file, or a record cut off part way through writing
+                return
+            kind, when, seed, offset, block, dice, again, rote, successes, count = RECORD.unpack(header)
+            faces = array('B', f.read(count))
+            flags = array('B', f.read(count))
+            yield LogEntry(KIND_NAMES[kind], when, seed, offset, block, dice, again, bool(rote), successes,
+                           faces, flags)
+
+
+def replay(entry, source=None):
+    '''
+    Rolls a logged entry again from its seed and offset.
+    source: a BufferedRNG already on the same seed and at or before the offset, to avoid starting over
+    Returns a RollResult.
+    '''
+    if source is None or source.seed != entry.seed or source.block != entry.block or source.position > entry.offset:
+        source = BufferedRNG(entry.seed, entry.block)
+    source.skip(entry.offset - source.position)
+
+    if entry.kind == 'chance':
+        return engine.roll_chance(source)
+    return engine.roll_pool(entry.dice, entry.again, entry.rote, source)
+
+
+def verify(path):
+    '''
+    Replays every roll in a log.
+    Returns (number of rolls checked, list of indexes of rolls that did not match).
+    '''
+    sources = {}
+    mismatches = []
+    checked = 0
+
+    for index, entry in enumerate(read(path)):
+        source = sources.get(entry.seed)
+        if source is None or source.position > entry.offset:
+            source = sources[entry.seed] = BufferedRNG(entry.seed, entry.block)
+
+        result = replay(entry, source)
+        if result.faces != entry.faces or result.flags != entry.flags or result.successes != entry.successes:
+            mismatches.append(index)
+        checked += 1
+
+    return checked, mismatches
+
+
+def describe(entry):
+    '''
+    One line summary of a log entry.
+    '''
+    out = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry.time)) + " "
+    if entry.kind == 'chance':
+        out += "chance die: " + str(entry.faces[0])
+    else:
+        out += str(entry.dice) + " dice, " + str(entry.again) + " again"
+        if entry.rote:
+            out += ", rote"
+        out += ": " + " ".join(str(value) for value in entry.faces)
+    out += " = " + str(entry.successes) + " successes"
+    return out
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Show or verify a Dicecord roll log.")
+    parser.add_argument('command', choices=('show', 'verify'))
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        for entry in read(args.path):
+            print(describe(entry))
+    else:
+        checked, mismatches = verify(args.path)
+        if mismatches:
+            print("Checked " + str(checked) + " rolls, " + str(len(mismatches)) + " did not match: "
+                  + ", ".join(str(index) for index in mismatches))
+        else:
+            print("Checked " + str(checked) + " rolls, all match.")
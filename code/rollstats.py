@@ -0,0 +1,137 @@
+# Running roll statistics created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+from array import array
+from xml.etree.ElementTree import Element
+import odds
+
+# rolls with this many successes or more share the last histogram bucket
+MAX_SUCCESSES = 20
+
+# running totals, kept in one fixed size array
+TOTALS = ('rolls',          # dice pool rolls
+          'dice',           # dice in those pools, before rerolls
+          'faces',          # every die rolled, including explosions and rote rerolls
+          'explosions',     # dice rolled because another exploded
+          'successes',      # total successes from dice pools
+          'expected',       # total successes the pools were expected to get
+          'failures',       # dice pool rolls with no successes
+          'chance rolls',
+          'chance successes',
+          'botches')
+
+# positions of each total in the array
+(ROLLS, DICE, FACES, EXPLOSIONS, SUCCESSES, EXPECTED, FAILURES,
+ CHANCE_ROLLS, CHANCE_SUCCESSES, BOTCHES) = range(len(TOTALS))
+
+
+class RollStats:
+    '''
+    Statistics of every roll a character has made, updated in constant time per roll.
+    Everything lives in fixed size arrays so the memory used never grows.
+    '''
+
+    def __init__(self):
+        self.totals = array('d', [0] * len(TOTALS))
+        self.histogram = array('L', [0] * (MAX_SUCCESSES + 1))
+
+    def __getitem__(self, name):
+        return self.totals[TOTALS.index(name)]
+
+    def add(self, result):
+        '''
+        Adds a RollResult to the running totals.
+        '''
+        totals = self.totals
+
+        if result.kind == 'chance':
+            totals[CHANCE_ROLLS] += 1
+            totals[CHANCE_SUCCESSES] += result.successes
+            totals[BOTCHES] += result.botched
+            return
+
+        totals[ROLLS] += 1
+        totals[DICE] += result.dice
+        totals[FACES] += len(result.faces)
+        totals[EXPLOSIONS] += result.explosions
+        totals[SUCCESSES] += result.successes
+        totals[EXPECTED] += odds.expected_successes(result.dice, result.again, result.rote)
+        totals[FAILURES] += not result.successes
+        self.histogram[min(result.successes, MAX_SUCCESSES)] += 1
+
+    def mean(self):
+        '''
+        Average successes per dice pool roll.
+        '''
+        rolls = self.totals[ROLLS]
+        return self.totals[SUCCESSES] / rolls if rolls else 0.0
+
+    def expected_mean(self):
+        '''
+        Average successes the same rolls should have got.
+        '''
+        rolls = self.totals[ROLLS]
+        return self.totals[EXPECTED] / rolls if rolls else 0.0
+
+    def explosion_rate(self):
+        '''
+        Share of rolled dice that were explosions.
+        '''
+        faces = self.totals[FACES]
+        return self.totals[EXPLOSIONS] / faces if faces else 0.0
+
+    def botch_rate(self):
+        '''
+        Share of chance dice that were dramatic failures.
+        '''
+        chances = self.totals[CHANCE_ROLLS]
+        return self.totals[BOTCHES] / chances if chances else 0.0
+
+    def lines(self):
+        '''
+        Summary of the statistics as lines of text.
+        '''
+        rolls = self.totals[ROLLS]
+        chances = self.totals[CHANCE_ROLLS]
+
+        out = ["Rolls: " + str(int(rolls)) + " pools, " + str(int(chances)) + " chance dice"]
+        if rolls:
+            out.append("Average successes: " + format(self.mean(), '.2f')
+                       + " (expected " + format(self.expected_mean(), '.2f') + ")")
+            out.append("No successes: " + format(self.totals[FAILURES] / rolls, '.0%'))
+            out.append("Explosions: " + format(self.explosion_rate(), '.1%') + " of dice")
+        if chances:
+            out.append("Chance die botches: " + format(self.botch_rate(), '.0%'))
+        return out
+
+    def to_element(self):
+        '''
+        XML element for saving with the character sheet.
+        '''
+        item = Element('rollstats')
+        for name, value in zip(TOTALS, self.totals):
+            total = Element(name.replace(' ', '_'))
+            total.text = repr(value)
+            item.append(total)
+
+        histogram = Element('histogram')
+        histogram.text = ' '.join(str(count) for count in self.histogram)
+        item.append(histogram)
+        return item
+
+    @classmethod
+    def from_element(cls, item):
+        '''
+        Rebuilds statistics from a saved XML element.
+        '''
+        out = cls()
+        for index, name in enumerate(TOTALS):
+            total = item.find(name.replace(' ', '_'))
+            if total is not None:
+                out.totals[index] = float(total.text)
+
+        histogram = item.find('histogram')
+        if histogram is not None and histogram.text:
+            for index, count in enumerate(histogram.text.split()[:MAX_SUCCESSES + 1]):
+                out.histogram[index] = int(count)
+        return out
@@ -0,0 +1,151 @@
+# Monte Carlo roll simulator created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import argparse
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dice import SUCCESS
+from rng import BufferedRNG
+
+
+def count_pool(dice, again, rote, source):
+    '''
+    Rolls a dice pool with roll_set rules, only counting the result.
+    Returns (successes, explosions).
+    '''
+    successes = 0
+    explosions = 0
+
+    faces = source.faces(dice)
+    # a rote rerolls every die whose first face failed
+    rerolls = dice - sum(faces.count(value) for value in range(SUCCESS, 11)) if rote else 0
+
+    while True:
+        exploding = sum(faces.count(value) for value in range(again, 11))
+        successes += sum(faces.count(value) for value in range(SUCCESS, 11))
+
+        if exploding:
+            explosions += exploding
+            faces = source.faces(exploding)
+        elif rerolls:
+            faces = source.faces(rerolls)
+            rerolls = 0
+        else:
+            return successes, explosions
+
+
+def run_chunk(trials, dice, again, rote, seed):
+    '''
+    Runs a share of the trials with its own seeded stream of faces.
+    Runs in a worker process, so only plain data is passed in and out.
+    '''
+    source = BufferedRNG(seed, block=65536)
+    successes = Counter()
+    explosions = Counter()
+    botches = 0
+
+    if dice < 1:
+        # chance die: only a 10 succeeds and a 1 is a dramatic failure
+        faces = source.faces(trials)
+        successes[1] = faces.count(10)
+        successes[0] = trials - successes[1]
+        botches = faces.count(1)
+        explosions[0] = trials
+    else:
+        for _ in range(trials):
+            result, exploded = count_pool(dice, again, rote, source)
+            successes[result] += 1
+            explosions[exploded] += 1
+
+    return successes, explosions, botches
+
+
+def simulate(dice, again=10, rote=False, trials=1000000, workers=None, seed=None):
+    '''
+    Simulates many rolls of the same pool over several processes.
+    dice: int, the number of dice to roll, less than 1 rolls a chance die
+    again: int, which die faces explode
+    rote: boolean, a rote roll rerolls all failed dice once
+    trials: int, how many rolls to simulate
+    workers: int, number of processes to use, defaults to the cpu count
+    seed: int, makes the simulation repeatable when given
+    Returns a dict with histograms (Counters) of successes and explosions, and the dramatic failure rate.
+    Raises ValueError if trials is less than 1.
+    '''
+    if trials < 1:
+        raise ValueError("trials must be at least 1")
+    if not workers:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, trials))
+
+    # every worker gets its own stream, all derived from one seed
+    master = random.Random(seed)
+    seeds = [master.getrandbits(64) for _ in range(workers)]
+    shares = [trials // workers + (index < trials % workers) for index in range(workers)]
+
+    successes = Counter()
+    explosions = Counter()
+    botches = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(run_chunk, share, dice, again, rote, chunk_seed)
+                for share, chunk_seed in zip(shares, seeds)]
+        for job in jobs:
+            chunk_successes, chunk_explosions, chunk_botches = job.result()
+            successes.update(chunk_successes)
+            explosions.update(chunk_explosions)
+            botches += chunk_botches
+
+    return {'trials': trials,
+            'successes': successes,
+            'explosions': explosions,
+            'botches': botches,
+            'botch rate': botches / trials if dice < 1 else 0.0}
+
+
+def report(result):
+    '''
+    Formats a simulation result as lines of text.
+    '''
+    trials = result['trials']
+    out = ["Trials: " + str(trials)]
+
+    mean = sum(count * times for count, times in result['successes'].items()) / trials
+    out.append("Average successes: " + format(mean, '.3f'))
+    out.append("Dramatic failure rate: " + format(result['botch rate'], '.2%'))
+
+    out.append("Successes:")
+    for count in sorted(result['successes']):
+        out.append("  " + str(count) + ": " + format(result['successes'][count] / trials, '.4%'))
+
+    out.append("Explosions:")
+    for count in sorted(result['explosions']):
+        out.append("  " + str(count) + ": " + format(result['explosions'][count] / trials, '.4%'))
+
+    return out
+
+
+def trial_count(text):
+    '''
+    Reads --trials, which must be at least 1.
+    '''
+    trials = int(text)
+    if trials < 1:
+        raise argparse.ArgumentTypeError("trials must be at least 1")
+    return trials
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate Chronicles of Darkness dice rolls.")
+    parser.add_argument('dice', type=int, help="dice pool, 0 rolls a chance die")
+    parser.add_argument('--again', type=int, default=10, choices=(8, 9, 10))
+    parser.add_argument('--rote', action='store_true')
+    parser.add_argument('--trials', type=trial_count, default=1000000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    result = simulate(args.dice, args.again, args.rote, args.trials, args.workers, args.seed)
+    print("\n".join(report(result)))
@@ -0,0 +1,287 @@
+# Mage spellcasting engine created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import dice as engine
+import odds
+
+# practices and the arcanum dots they need
+PRACTICES = [('compelling', 1),
+             ('knowing', 1),
+             ('unveiling', 1),
+             ('ruling', 2),
+             ('shielding', 2),
+             ('veiling', 2),
+             ('fraying', 3),
+             ('perfecting', 3),
+             ('weaving', 3),
+             ('patterning', 4),
+             ('unraveling', 4),
+             ('making', 5),
+             ('unmaking', 5)]
+
+# spell factors, each step up the table costs FACTOR_PENALTY dice
+# advanced duration and scale cost a reach
+FACTOR_PENALTY = 2
+
+DURATION = {0: '1 turn',
+            1: '2 turns',
+            2: '3 turns',
+            3: '5 turns',
+            4: '10 turns'}
+ADV_DURATION = {0: '1 scene/hour',
+                1: '1 day',
+                2: '1 week',
+                3: '1 month',
+                4: '1 year',
+                5: 'indefinite'}
+
+SCALE = {0: '1 subject, size 5, arm\'s reach',
+         1: '2 subjects, size 6, small room',
+         2: '4 subjects, size 7, large room',
+         3: '8 subjects, size 8, single floor of a house',
+         4: '16 subjects, size 9, small house'}
+ADV_SCALE = {0: '5 subjects, size 5, large house',
+             1: '10 subjects, size 10, small warehouse',
+             2: '20 subjects, size 15, supermarket',
+             3: '40 subjects, size 20, shopping mall',
+             4: '80 subjects, size 25, city block',
+             5: '160 subjects, size 30, small neighbourhood'}
+
+# dice each yantra adds, the total bonus can't go over MAX_YANTRAS
+YANTRAS = {'demesne': 2,
+           'environment': 1,
+           'supernal verge': 2,
+           'concentration': 2,
+           'mantra': 2,
+           'runes': 2,
+           'path tool': 1,
+           'order tool': 1,
+           'material sympathy': 2,
+           'representational sympathy': 1,
+           'shadow name': 1,
+           'cabal theme': 1}
+MAX_YANTRAS = 5
+
+# ritual casting intervals by gnosis, extra intervals add a die each up to MAX_RITUAL_BONUS
+RITUAL_INTERVAL = ('3 hours', '3 hours', '1 hour', '1 hour', '30 minutes', '30 minutes',
+                   '10 minutes', '10 minutes', '1 minute', '1 minute')
+MAX_RITUAL_BONUS = 5
+
+# paradox dice for each reach past the free ones, by gnosis
+PARADOX_PER_REACH = (1, 1, 2, 2, 3, 3, 4, 4, 5, 5)
+
+# the successes that count as exceptional, praxes need fewer
+EXCEPTIONAL = 5
+PRAXIS_EXCEPTIONAL = 3
+
+# everything a spell can be cast with, anything not given uses these
+SPELL = {'arcanum': 'forces',
+         'practice': 'compelling',
+         'potency': 1,
+         'primary factor': 'potency',
+         'duration': 0,
+         'advanced duration': False,
+         'scale': 0,
+         'advanced scale': False,
+         'advanced range': False,
+         'ritual intervals': 1,         # 0 is an instant cast, which costs a reach
+         'extra reaches': 0,            # reaches spent on effects not covered above
+         'yantras': (),
+         'rote': False,
+         'praxis': False,
+         'witnesses': False,            # sleepers see the spell
+         'paradox rolls': 0,            # paradox already rolled this scene
+         'dedicated tool': False,
+         'paradox mana': 0}             # mana spent to cut the paradox pool
+
+
+def practice_level(practice):
+    '''
+    Arcanum dots needed for a practice.
+    '''
+    return dict(PRACTICES)[practice]
+
+
+def calculate(character_stats, spell):
+    '''
+    Works out the casting and paradox pools for a spell.
+    character_stats: the mage's stats dict, needs gnosis and arcana
+    spell: dict of spell choices, see SPELL for the keys
+    Raises ValueError if the arcanum is too low for the practice.
+    Returns a dict with the pools, reaches, mana cost, casting time and a list of (reason, dice) parts of the pool.
+    '''
+    details = SPELL.copy()
+    details.update(spell)
+
+    gnosis = min(max(character_stats['gnosis'], 1), 10)
+    arcanum = character_stats[details['arcanum']]
+    parts = [('gnosis', gnosis), (details['arcanum'], arcanum)]
+
+    # free reaches depend on how far the arcanum is past the practice
+    level = practice_level(details['practice'])
+    if arcanum < level:
+        raise ValueError(details['practice'].title() + " needs " + str(level) + " dots of "
+                         + details['arcanum'].title() + ".")
+    free = arcanum - level + 1
+
+    reaches = details['extra reaches']
+    reaches += details['advanced duration'] + details['advanced scale'] + details['advanced range']
+
+    # yantras
+    bonus = sum(YANTRAS[yantra] for yantra in details['yantras'])
+    if bonus:
+        parts.append(('yantras', min(bonus, MAX_YANTRAS)))
+
+    # casting time
+    intervals = details['ritual intervals']
+    if intervals <= 0:
+        reaches += 1
+        time = 'instant'
+    else:
+        time = str(intervals) + ' x ' + RITUAL_INTERVAL[gnosis - 1]
+        if intervals > 1:
+            parts.append(('ritual time', min(intervals - 1, MAX_RITUAL_BONUS)))
+
+    # the primary factor gets arcanum - 1 steps for free
+    steps = {'potency': details['potency'] - 1, 'duration': details['duration'], 'scale': details['scale']}
+    steps[details['primary factor']] = max(steps[details['primary factor']] - (arcanum - 1), 0)
+    for factor in ('potency', 'duration', 'scale'):
+        if steps[factor] > 0:
+            parts.append((factor, -FACTOR_PENALTY * steps[factor]))
+
+    # indefinite duration also costs a mana
+    mana = 0
+    if details['advanced duration'] and details['duration'] == max(ADV_DURATION):
+        mana += 1
+
+    pool = sum(dice for reason, dice in parts)
+
+    # paradox only comes into it once the free reaches are used up
+    over = max(reaches - free, 0)
+    paradox = None
+    if over:
+        paradox = over * PARADOX_PER_REACH[gnosis - 1]
+        paradox += details['witnesses'] + details['paradox rolls']
+        if details['dedicated tool']:
+            paradox -= 2
+
+        # mana cancels paradox dice one for one, and can stop the roll altogether
+        spent = min(details['paradox mana'], max(paradox, 0))
+        mana += spent
+        paradox -= spent
+        if spent and paradox <= 0:
+            paradox = None
+
+    return {'pool': pool,
+            'parts': parts,
+            'free reaches': free,
+            'reaches': reaches,
+            'paradox': paradox,
+            'mana': mana,
+            'time': time,
+            'rote': details['rote'],
+            'exceptional': PRAXIS_EXCEPTIONAL if details['praxis'] else EXCEPTIONAL}
+
+
+def chances(calculated):
+    '''
+    Exact chances for a calculated spell: (success, exceptional success, paradox).
+    Taken from the cached odds distributions, pools below 1 are chance dice.
+    '''
+    pool = calculated['pool']
+    if pool < 1:
+        success = odds.CHANCE_SUCCESS
+        exceptional = 0.0
+    else:
+        success = odds.at_least(pool, 1, 10, calculated['rote'])
+        exceptional = odds.at_least(pool, calculated['exceptional'], 10, calculated['rote'])
+
+    paradox = calculated['paradox']
+    if paradox is None:
+        paradox_chance = 0.0
+    elif paradox < 1:
+        paradox_chance = odds.CHANCE_SUCCESS
+    else:
+        paradox_chance = odds.at_least(paradox, 1)
+
+    return success, exceptional, paradox_chance
+
+
+def pools(calculated):
+    '''
+    The casting pool followed by the paradox pool if there is one, as (dice, again, rote) tuples.
+    '''
+    out = [(calculated['pool'], 10, calculated['rote'])]
+    if calculated['paradox'] is not None:
+        out.append((calculated['paradox'], 10, False))
+    return out
+
+
+def cast(calculated, source=None):
+    '''
+    Rolls the casting pool and any paradox in one batch.
+    Returns (casting RollResult, paradox RollResult or None).
+    '''
+    results = engine.roll_pools(pools(calculated), source)
+    if len(results) == 1:
+        return results[0], None
+    return results[0], results[1]
+
+
+def describe(calculated):
+    '''
+    Lines of text explaining the pools, used before the spell is cast.
+    '''
+    success, exceptional, paradox = chances(calculated)
+
+    pool = calculated['pool']
+    out = ["Casting pool: " + (str(pool) if pool >= 1 else "chance die") + " ("
+           + ", ".join(reason + " " + format(dice, '+d') for reason, dice in calculated['parts']) + ")",
+           "Reaches: " + str(calculated['reaches']) + " of " + str(calculated['free reaches']) + " free",
+           "Casting time: " + calculated['time']]
+
+    if calculated['paradox'] is None:
+        out.append("Paradox: none")
+    elif calculated['paradox'] < 1:
+        out.append("Paradox pool: chance die")
+    else:
+        out.append("Paradox pool: " + str(calculated['paradox']))
+
+    if calculated['mana']:
+        out.append("Mana: " + str(calculated['mana']))
+
+    out.append("Success: " + format(success, '.0%') + ", exceptional: " + format(exceptional, '.0%')
+               + ", paradox: " + format(paradox, '.0%'))
+    return out
+
+
+def summary(user, spell_name, calculated, result, paradox=None):
+    '''
+    Single message for a cast spell and its paradox.
+    '''
+    out = user + " cast " + spell_name + ": "
+    if result.kind == 'chance':
+        out += "chance die, rolled " + str(result.faces[0])
+        if result.botched:
+            out += ", dramatic failure!"
+        elif result.successes:
+            out += ", success!"
+        else:
+            out += ", failed."
+    else:
+        out += str(result.successes) + " successes from " + str(calculated['pool']) + " dice"
+        if result.successes >= calculated['exceptional']:
+            out += ", exceptional success!"
+        elif result.successes:
+            out += "."
+        else:
+            out += ", failed."
+
+    if paradox is not None:
+        out += "\nParadox: " + str(paradox.successes) + " successes"
+        if paradox.kind == 'chance':
+            out += " on a chance die"
+
+    if calculated['mana']:
+        out += "\nMana spent: " + str(calculated['mana'])
+    return out
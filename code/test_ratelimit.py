@@ -0,0 +1,147 @@
+# Tests for the webhook rate limiter, created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import pytest
+import ratelimit
+
+WEBHOOK = "/api/webhooks/1/token"
+
+
+class Clock:
+    '''
+    Stands in for time.monotonic, only moves when told to.
+    '''
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, 'monotonic', clock)
+    return clock
+
+
+def headers(remaining, limit=5, reset_after=2):
+    return {'x-ratelimit-remaining': str(remaining),
+            'x-ratelimit-limit': str(limit),
+            'x-ratelimit-reset-after': str(reset_after)}
+
+
+def reserve(limiter, count, webhook=WEBHOOK):
+    return [round(limiter.reserve(webhook), 3) for message in range(count)]
+
+
+def test_unknown_bucket_sends_straight_away(clock):
+    limiter = ratelimit.RateLimiter()
+    assert reserve(limiter, 3) == [0, 0, 0]
+
+
+def test_burst_into_empty_bucket_waits_for_each_window(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(0))
+
+    # every message placed in a later window waits until it opens
+    assert reserve(limiter, 12) == [2] * 5 + [4] * 5 + [6] * 2
+
+
+def test_room_left_is_used_before_waiting(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(3))
+
+    assert reserve(limiter, 4) == [0, 0, 0, 2]
+
+
+def test_bucket_refills_once_reset_passes(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(0))
+
+    clock.now += 2.5
+    assert reserve(limiter, 6) == [0] * 5 + [2]
+
+
+def test_waits_shrink_as_time_passes(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(0))
+
+    assert reserve(limiter, 1) == [2]
+    clock.now += 1.5
+    assert reserve(limiter, 1) == [0.5]
+
+
+def test_limited_empties_bucket(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(4, reset_after=1))
+
+    # a 429 anyway, e.g. another program posting to the same webhook
+    limiter.limited(WEBHOOK, 1.5)
+    assert reserve(limiter, 6) == [1.5] * 5 + [3.5]
+
+
+def test_limited_never_shortens_a_known_wait(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(0, reset_after=3))
+
+    limiter.limited(WEBHOOK, 1)
+    assert reserve(limiter, 1) == [3]
+
+
+def test_pending_messages_count_against_headers(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(5))
+
+    # two messages go out, the first response only counts the first of them
+    assert reserve(limiter, 2) == [0, 0]
+    limiter.update(WEBHOOK, headers(4))
+    assert limiter.bucket(WEBHOOK).pending == 1
+
+    # 4 left by Discord's count, less the message still waiting on a response
+    assert reserve(limiter, 4) == [0, 0, 0, 2]
+
+
+def test_waiting_messages_carry_into_later_windows(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(0))
+
+    # five messages fill the next window, a response arriving meanwhile mustn't give their places away
+    assert reserve(limiter, 5) == [2] * 5
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(0))
+    assert reserve(limiter, 1) == [4]
+
+
+def test_release_gives_back_pending(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.release(WEBHOOK)
+    assert limiter.bucket(WEBHOOK).pending == 0
+
+
+def test_full_url_and_path_share_a_bucket(clock):
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, headers(0))
+
+    assert reserve(limiter, 1, "https://discordapp.com" + WEBHOOK) == [2]
+    assert limiter.bucket("https://discordapp.com" + WEBHOOK) is limiter.bucket(WEBHOOK)
+
+
+def test_reset_header_used_without_reset_after(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: 50000.0)
+    limiter = ratelimit.RateLimiter()
+    limiter.reserve(WEBHOOK)
+    limiter.update(WEBHOOK, {'x-ratelimit-remaining': '0', 'x-ratelimit-limit': '5',
+                             'x-ratelimit-reset': '50001.5'})
+
+    assert reserve(limiter, 1) == [1.5]
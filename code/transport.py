@@ -0,0 +1,223 @@
+# Pooled HTTPS connections for webhooks, created for use in conjunction with Dicecord.
+#    Copyright (C) 2017  Roy Healy
+
+import http.client
+import threading
+import time
+
+# If expanding to other services further changes will be required here
+HOST = "discordapp.com"
+
+# idle connections kept open per host
+POOL_SIZE = 2
+
+# seconds an idle connection is kept before it is closed rather than reused
+IDLE_TIMEOUT = 60
+
+# seconds to wait on the network before giving up on a request
+TIMEOUT = 30
+
+# seperator between the parts of the form sent to a webhook
+SEPARATOR = "--11BOUND11"
+
+# longest message Discord will post
+MESSAGE_LIMIT = 2000
+
+# what a webhook's response means, see read_response
+SENT = 'sent'
+RATE_LIMITED = 'rate limited'
+FAILED = 'failed'
+
+# anything that can go wrong sending a message, e.g. a timeout, no connection or a garbled response
+ERRORS = (OSError, http.client.HTTPException)
+
+# errors sending a request on a kept alive connection the server has closed, the request didn't go out
+# so it is tried again on a new one
+# errors after it went out are raised instead, Discord may already have posted the message
+CLOSED = (http.client.CannotSendRequest,
+          ConnectionResetError,
+          BrokenPipeError)
+
+
+def form(message):
+    '''
+    Payload and headers that make a Discord webhook send message to its channel, used by every sender.
+    If expanding to other services further changes may be required here
+    '''
+    # input sanitation: the seperator is replaced by a space if found in message
+    message = message.replace(SEPARATOR, " ")
+    payload = (SEPARATOR + "\r\nContent-Disposition: form-data; name=\"content\"\r\n\r\n" + message + "\r\n"
+               + SEPARATOR + "--")
+    headers = {'content-type': "multipart/form-data; boundary=" + SEPARATOR[2:],
+               'cache-control': "no-cache"}
+    return payload, headers
+
+
+def retry_after(text):
+    '''
+    Seconds to wait when Discord says we are rate limited.
+    '''
+    # Discord will helpfully tell the user how long they need to wait until the next retry
+    index = text.find('"retry_after"')
+    wait = ''
+    for character in text[index + 13:]:
+        # given in miliseconds usually
+        if character in '0123456789':
+            wait += character
+        if character in '\n,}':
+            break
+    # convert to seconds and add 0.5 just in case
+    return int(wait or 0) / 1000 + 0.5
+
+
+def read_response(status, text):
+    '''
+    Works out what a webhook's response means, shared by every sender.
+    For discord, the text will be blank unless an error occures sending the message, usually a rate limit hit.
+    For expansion to other services this may need to be updated
+    Returns (outcome, detail): (SENT, None), (RATE_LIMITED, seconds to wait) or (FAILED, status message).
+    '''
+    if "rate limited" in text:
+        return RATE_LIMITED, retry_after(text)
+
+    if "400 Bad Request" in text or status == 400:
+        # Likely bad bad URL
+        return FAILED, "400 Bad Request - Double check URL."
+
+    if text != "":
+        # Unexpected problem, the message Discord gave is shown
+        index1 = text.find('"message"')
+        index2 = text.find('\n', index1)
+        return FAILED, text[index1:index2] if index2 != -1 else text[index1:]
+
+    return SENT, None
+
+
+def coalesce(messages, limit=MESSAGE_LIMIT):
+    '''
+    Packs messages into as few posts as possible, one message per line, keeping their order.
+    No post is longer than limit, a single message over it is split across posts.
+    '''
+    posts = []
+    current = ""
+    for message in messages:
+        while len(message) > limit:
+            if current:
+                posts.append(current)
+                current = ""
+            posts.append(message[:limit])
+            message = message[limit:]
+
+        if not current:
+            current = message
+        elif len(current) + 1 + len(message) <= limit:
+            current += "\n" + message
+        else:
+            posts.append(current)
+            current = message
+
+    if current:
+        posts.append(current)
+    return posts
+
+
+class ConnectionPool:
+    '''
+    Keeps HTTPS connections alive between messages so each one doesn't need a new TCP and TLS handshake.
+    Idle connections are kept per host, up to size of them, for idle_timeout seconds.
+    '''
+
+    def __init__(self, size=POOL_SIZE, idle_timeout=IDLE_TIMEOUT, timeout=TIMEOUT,
+                 connection=http.client.HTTPSConnection):
+        '''
+        connection: class used to open connections, plain HTTPConnection works for local testing
+        '''
+        self.connection = connection
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        # host -> list of (connection, time it was last used), most recent last
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, host):
+        '''
+        Returns (connection, reused): an idle connection to host if there is a fresh one, otherwise a new one.
+        '''
+        now = time.monotonic()
+        with self.lock:
+            connections = self.idle.get(host, [])
+            while connections:
+                connection, used = connections.pop()
+                if now - used < self.idle_timeout:
+                    return connection, True
+                connection.close()
+        return self.connection(host, timeout=self.timeout), False
+
+    def release(self, host, connection):
+        '''
+        Puts a connection back once its response has been read, closing it if the pool is full.
+        '''
+        with self.lock:
+            connections = self.idle.setdefault(host, [])
+            if len(connections) < self.size:
+                connections.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def request(self, method, path, body=None, headers=None, host=HOST):
+        '''
+        Sends a request on a pooled connection.
+        If the server has closed a reused connection before the request went out it is sent again on a new one.
+        Returns (response, text): the response is fully read so its headers can still be checked.
+        '''
+        while True:
+            connection, reused = self.acquire(host)
+            try:
+                connection.request(method, path, body, headers or {})
+            except CLOSED:
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+            try:
+                response = connection.getresponse()
+                text = response.read().decode("utf-8")
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(host, connection)
+            return response, text
+
+    def close(self):
+        '''
+        Closes every idle connection.
+        '''
+        with self.lock:
+            for connections in self.idle.values():
+                for connection, used in connections:
+                    connection.close()
+            self.idle = {}
+
+
+# shared by every message sent
+POOL = ConnectionPool()
+
+
+def configure(size=None, idle_timeout=None):
+    '''
+    Changes how many connections the shared pool keeps and for how long.
+    '''
+    if size is not None:
+        POOL.size = size
+    if idle_timeout is not None:
+        POOL.idle_timeout = idle_timeout